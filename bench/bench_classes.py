@@ -0,0 +1,9 @@
+""" Classes instantiated by the benchmark configs """
+# pylint: disable=too-few-public-methods
+
+
+class Service(object):
+    """ Accepts and keeps any arguments """
+    def __init__(self, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
@@ -0,0 +1,89 @@
+""" Synthetic service config generators for benchmarks """
+import random
+
+
+MODULE = 'bench_classes'
+CLASS = 'Service'
+
+
+def _service(args=None, kwargs=None):
+    """ Service config using the benchmark class """
+    conf = {'module': MODULE, 'class': CLASS}
+    if args:
+        conf['args'] = args
+    if kwargs:
+        conf['kwargs'] = kwargs
+    return conf
+
+
+def _name(index):
+    """ Service name of an index """
+    return 's%d' % index
+
+
+def chain(size):
+    """ s0 <- s1 <- ... <- sN: every service depends on the previous """
+    config = {_name(0): _service()}
+    for index in xrange(1, size):
+        config[_name(index)] = _service(['@' + _name(index - 1)])
+    return config
+
+
+def fan(size):
+    """ One root, size - 2 services using it, one sink using them all """
+    size = max(size, 3)
+    config = {'root': _service()}
+    middle = [_name(index) for index in xrange(size - 2)]
+    for name in middle:
+        config[name] = _service(['@root'])
+    config['sink'] = _service(['@' + name for name in middle])
+    return config
+
+
+def diamond(size, width=4):
+    """ Lattice of layers where each service uses every one below it """
+    layers = max(size // width, 1)
+    config = {}
+    for layer in xrange(layers):
+        for index in xrange(width):
+            args = []
+            if layer:
+                args = ['@l%d_%d' % (layer - 1, below)
+                        for below in xrange(width)]
+            config['l%d_%d' % (layer, index)] = _service(args)
+    return config
+
+
+def random_dag(size, degree=3, seed=0):
+    """ Random DAG: each service uses up to degree earlier services """
+    rand = random.Random(seed)
+    config = {}
+    for index in xrange(size):
+        count = min(index, degree)
+        dependencies = rand.sample(xrange(index), count) if count else []
+        config[_name(index)] = _service(
+            ['@' + _name(dependency) for dependency in dependencies]
+        )
+    return config
+
+
+def nested_args(size, depth=10, literal_size=50):
+    """ Independent services with deeply nested args and scalars """
+    config = {}
+    for index in xrange(size):
+        arg = {'scalar': '$value', 'literal': range(literal_size)}
+        for _ in xrange(depth):
+            arg = {'nested': [arg, 'text']}
+        config[_name(index)] = _service([arg])
+    return config
+
+
+GENERATORS = {
+    'chain': chain,
+    'fan': fan,
+    'diamond': diamond,
+    'random_dag': random_dag,
+    'nested_args': nested_args
+}
+
+SCALARS = {'value': 42}
@@ -0,0 +1,150 @@
+'''
+Times the resolver on synthetic service graphs.
+
+    python bench/run.py --sizes 10,1000,100000 --output results.json
+    python bench/run.py --baseline results.json --threshold 0.2
+'''
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'bench'))
+
+# The imports below need the path set up above
+from generators import GENERATORS  # noqa
+from generators import SCALARS  # noqa
+from resolver import detect_circle  # noqa
+from resolver import Resolver  # noqa
+from services import ServiceFactory  # noqa
+
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+
+
+def _best_of(repeat, func):
+    """ Best wall-clock time of func over repeat runs """
+    best = None
+    for _ in xrange(repeat):
+        gc.collect()
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def _create_all(config, order):
+    """ Create every service with create_from_dict in order """
+    factory = ServiceFactory(SCALARS)
+    for name in order:
+        factory.add_instantiated_service(
+            name, factory.create_from_dict(config[name])
+        )
+
+
+def run_case(generator, size, repeat):
+    """ Time every operation on one generated config """
+    config = GENERATORS[generator](size)
+    nodes = Resolver(config, SCALARS).nodes
+    order = Resolver(config, SCALARS).compile().order
+    operations = [
+        ('detect_circle', lambda: detect_circle(nodes)),
+        ('Resolver.__init__', lambda: Resolver(config, SCALARS)),
+        ('Resolver.do', lambda: Resolver(config, SCALARS).do()),
+        ('ServiceFactory.create_from_dict',
+         lambda: _create_all(config, order))
+    ]
+    results = []
+    for (operation, func) in operations:
+        results.append({
+            'generator': generator,
+            'size': size,
+            'services': len(config),
+            'operation': operation,
+            'seconds': _best_of(repeat, func)
+        })
+    return results
+
+
+def compare(results, baseline, threshold):
+    """ Return results slower than baseline by more than threshold """
+    previous = {}
+    for result in baseline['results']:
+        key = (result['generator'], result['size'], result['operation'])
+        previous[key] = result['seconds']
+
+    regressions = []
+    for result in results:
+        key = (result['generator'], result['size'], result['operation'])
+        if key not in previous or not previous[key]:
+            continue
+        ratio = result['seconds'] / previous[key]
+        if ratio > 1 + threshold:
+            regressions.append((result, previous[key], ratio))
+    return regressions
+
+
+def main():
+    """ Parse arguments, run cases, write and compare results """
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--sizes', default=None,
+                        help='comma separated service counts')
+    parser.add_argument('--generators', default=None,
+                        help='comma separated generator names (%s)'
+                        % ', '.join(sorted(GENERATORS)))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=None,
+                        help='write JSON results to this file')
+    parser.add_argument('--baseline', default=None,
+                        help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown ratio before failing')
+    args = parser.parse_args()
+
+    sizes = DEFAULT_SIZES
+    if args.sizes:
+        sizes = [int(size) for size in args.sizes.split(',')]
+    generators = sorted(GENERATORS)
+    if args.generators:
+        generators = args.generators.split(',')
+
+    results = []
+    for generator in generators:
+        for size in sizes:
+            for result in run_case(generator, size, args.repeat):
+                results.append(result)
+                print '%-12s %7d %-32s %10.6fs' % (
+                    generator, size, result['operation'], result['seconds']
+                )
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as baseline:
+            regressions = compare(results, json.load(baseline),
+                                  args.threshold)
+        for (result, previous, ratio) in regressions:
+            print 'REGRESSION %s %d %s: %.6fs -> %.6fs (x%.2f)' % (
+                result['generator'], result['size'], result['operation'],
+                previous, result['seconds'], ratio
+            )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+'''
+Resolves a YAML service config, measuring every service, and prints
+the critical path and the services worth speeding up.
+
+    python bin/startup_report.py config.yml --path src --top 10
+    python bin/startup_report.py config.yml --trace boot-trace.json
+    python bin/startup_report.py base.yml web.yml --cache-dir .cache
+'''
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+)
+
+# The imports below need the path set up above
+from hooks import ChromeTraceCollector  # noqa
+from loader import load_config  # noqa
+from report import PARALLEL  # noqa
+from report import SEQUENTIAL  # noqa
+from report import StartupReport  # noqa
+from resolver import Resolver  # noqa
+
+
+def _load_trace_costs(trace_path):
+    """ Per-service costs from a Chrome trace written by a collector """
+    costs = {}
+    with open(trace_path, 'r') as trace_file:
+        for event in json.load(trace_file)['traceEvents']:
+            if event.get('cat') == 'service':
+                service = event['args']['service']
+                costs[service] = costs.get(service, 0) \
+                    + event['dur'] / 1000000.0
+    return costs
+
+
+def main():
+    """ Parse arguments, measure or load costs and print the report """
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('config', nargs='+',
+                        help='YAML service config files, merged in order')
+    parser.add_argument('--scalars', default=None,
+                        help='YAML file of scalar values')
+    parser.add_argument('--cache-dir', default=None,
+                        help='cache parsed config files in this directory')
+    parser.add_argument('--path', action='append', default=[],
+                        help='directory to add to sys.path for services')
+    parser.add_argument('--trace', default=None,
+                        help='take costs from this Chrome trace instead '
+                        'of resolving the config')
+    parser.add_argument('--parallel', type=int, default=None,
+                        help='measure costs resolving on this many threads')
+    parser.add_argument('--mode', choices=[PARALLEL, SEQUENTIAL],
+                        default=PARALLEL,
+                        help='instantiation mode to analyse; parallel '
+                        'assumes unlimited workers, whatever --parallel')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--json', action='store_true',
+                        help='print the report as JSON')
+    args = parser.parse_args()
+
+    sys.path[0:0] = args.path
+    config = load_config(args.config, args.cache_dir)
+    scalars = {}
+    if args.scalars:
+        scalars = load_config(args.scalars, args.cache_dir)
+    resolver = Resolver(config, scalars)
+
+    if args.trace:
+        costs = _load_trace_costs(args.trace)
+    else:
+        collector = ChromeTraceCollector()
+        resolver.add_hook(collector)
+        resolver.do(parallel=args.parallel)
+        costs = collector.get_durations()
+
+    report = StartupReport(resolver.nodes, costs, args.mode, args.top)
+    if args.json:
+        print json.dumps(report.to_dict(), indent=2, sort_keys=True)
+    else:
+        print report.format()
+
+
+if __name__ == '__main__':
+    main()
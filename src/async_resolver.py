@@ -0,0 +1,104 @@
+""" Async Resolver Module """
+from resolver import Resolver
+from resolver import UnknownServiceException
+from services import asyncio
+from template import SINGLETON
+
+
+class AsyncResolver(Resolver):
+    """
+        Resolver running on an asyncio event loop. Services whose
+        constructor, factory method or calls return coroutines are
+        awaited, and ready services are built concurrently.
+    """
+    # pylint: disable=too-many-locals
+    def ado(self, timeouts=None, loop=None, only=None):
+        """
+            Return a future resolving to the instantiated services.
+            timeouts optionally maps service names to seconds, and
+            only restricts building to services as in do().
+        """
+        if asyncio is None:
+            raise RuntimeError('asyncio (or trollius) is not available')
+        if timeouts is None:
+            timeouts = {}
+        if loop is None:
+            loop = asyncio.get_event_loop()
+        result = asyncio.Future(loop=loop)
+        if not self._nodes:
+            if only:
+                raise UnknownServiceException(list(only))
+            result.set_result(None)
+            return result
+
+        graph = self.graph
+        closure = None
+        if only is None:
+            order = self.compile().order
+        else:
+            closure = self._get_closure_ids(only)
+            order = graph.get_names(graph.topological_ids(closure))
+        (in_degrees, pending) = self._get_pending_in_degrees(closure)
+        errors = {}
+        running = set()
+
+        def _start(node_id):
+            """ Schedule a service whose dependencies are all built """
+            name = graph.get_name(node_id)
+            if self._factory.hooks:
+                self._factory.emit('start', name, 'service')
+            if self._templates[name].scope == SINGLETON:
+                future = self._factory.acreate_from_template(
+                    self._templates[name], loop, name
+                )
+            else:
+                # Prototypes and pools are provided synchronously
+                future = asyncio.Future(loop=loop)
+                try:
+                    self._provide(name)
+                    future.set_result(None)
+                # pylint: disable=broad-except
+                except Exception as exception:
+                    future.set_exception(exception)
+            if timeouts.get(name) is not None:
+                future = asyncio.ensure_future(
+                    asyncio.wait_for(future, timeouts[name]), loop=loop
+                )
+            running.add(node_id)
+            future.add_done_callback(lambda future: _done(node_id, future))
+
+        def _done(node_id, future):
+            """ Record a built service and start its ready dependents """
+            running.discard(node_id)
+            name = graph.get_name(node_id)
+            if self._factory.hooks:
+                self._factory.emit('end', name, 'service')
+            if future.cancelled():
+                errors[name] = asyncio.CancelledError()
+            elif future.exception() is not None:
+                errors[name] = future.exception()
+            else:
+                if self._templates[name].scope == SINGLETON:
+                    self._factory.add_instantiated_service(name,
+                                                           future.result())
+                if not errors:
+                    for dependent_id in graph.get_dependent_ids(node_id):
+                        in_degrees[dependent_id] -= 1
+                        if in_degrees[dependent_id] == 0:
+                            _start(dependent_id)
+
+            if running:
+                return
+            # Raise the failure that comes first in plan order
+            for ordered_name in order:
+                if ordered_name in errors:
+                    result.set_exception(errors[ordered_name])
+                    return
+            result.set_result(self._factory.get_instantiated_services())
+
+        ready = [node_id for node_id in pending if in_degrees[node_id] == 0]
+        if not ready:
+            result.set_result(self._factory.get_instantiated_services())
+        for node_id in ready:
+            _start(node_id)
+        return result
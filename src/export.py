@@ -0,0 +1,101 @@
+""" Export Module """
+import json
+
+from tree import iter_strings
+
+
+def get_subgraph_ids(graph, names=None, dependencies=False,
+                     dependents=False):
+    """
+        Return the ids of names (every id if names is None), plus
+        everything they transitively depend on and everything that
+        transitively depends on them, when asked to
+    """
+    if names is None:
+        return xrange(len(graph))
+    node_ids = [graph.get_id(name) for name in names]
+    members = set(node_ids)
+    if dependencies:
+        members.update(graph.closure_ids(node_ids))
+    if dependents:
+        members.update(graph.dependent_closure_ids(node_ids))
+    return sorted(members)
+
+
+def _iter_adjacency(graph, node_ids):
+    """
+        Yield (name, dependency names) for node_ids, keeping only the
+        edges within them; undefined dependencies are always kept
+    """
+    members = bytearray(len(graph))
+    for node_id in node_ids:
+        members[node_id] = 1
+    undefined = graph.undefined
+    for node_id in node_ids:
+        name = graph.get_name(node_id)
+        dependencies = [graph.get_name(dependency_id) for dependency_id
+                        in graph.get_dependency_ids(node_id)
+                        if members[dependency_id]]
+        dependencies.extend(sorted(undefined.get(name, ())))
+        yield (name, dependencies)
+
+
+def _quote(name):
+    """ Quote a name as a DOT identifier """
+    return '"%s"' % name.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def write_dot(graph, output, names=None, dependencies=False,
+              dependents=False):
+    """
+        Stream a DependencyGraph (or the subgraph selected as in
+        get_subgraph_ids) to the output file as a Graphviz digraph,
+        edges pointing from services to their dependencies
+    """
+    node_ids = get_subgraph_ids(graph, names, dependencies, dependents)
+    output.write('digraph services {\n')
+    for (name, dependency_names) in _iter_adjacency(graph, node_ids):
+        output.write('  %s;\n' % _quote(name))
+        for dependency in dependency_names:
+            if dependency not in graph:
+                output.write('  %s [style=dashed];\n' % _quote(dependency))
+            output.write('  %s -> %s;\n' % (_quote(name),
+                                            _quote(dependency)))
+    output.write('}\n')
+
+
+def write_json(graph, output, names=None, dependencies=False,
+               dependents=False):
+    """
+        Stream a DependencyGraph (or a subgraph) to the output file as
+        a JSON object of dependency name lists by service name
+    """
+    node_ids = get_subgraph_ids(graph, names, dependencies, dependents)
+    output.write('{')
+    separator = '\n'
+    for (name, dependency_names) in _iter_adjacency(graph, node_ids):
+        output.write('%s  %s: %s' % (separator, json.dumps(name),
+                                     json.dumps(dependency_names)))
+        separator = ',\n'
+    output.write('\n}\n')
+
+
+def write_adjacency(graph, output, names=None, dependencies=False,
+                    dependents=False):
+    """
+        Stream a DependencyGraph (or a subgraph) to the output file as
+        an adjacency list: one "service: dependency ..." line each
+    """
+    node_ids = get_subgraph_ids(graph, names, dependencies, dependents)
+    for (name, dependency_names) in _iter_adjacency(graph, node_ids):
+        output.write('%s: %s\n' % (name, ' '.join(dependency_names)))
+
+
+def write_tree(tree, output):
+    """ Stream str() of a (Compact)DependencyTree to the output file """
+    separator = ''
+    for head in tree.heads:
+        output.write(separator + 'H')
+        for string in iter_strings(head):
+            output.write(string)
+        separator = ', '
@@ -0,0 +1,354 @@
+""" Graph Module """
+from array import array
+from collections import deque
+
+
+class DependencyGraph(object):
+    """
+        Dependency graph with service names interned to dense integer
+        ids. Forward and reverse edges are kept as compressed sparse
+        rows (offset and id arrays), so memory and traversal cost
+        scale with the number of edges rather than with string sets.
+    """
+    # pylint: disable=too-many-instance-attributes, too-many-public-methods
+    __slots__ = ('_names', '_ids', '_dependency_offsets', '_dependency_ids',
+                 '_dependent_offsets', '_dependent_ids', '_in_degrees',
+                 '_undefined', '_depths')
+
+    # pylint: disable=too-many-locals
+    def __init__(self, nodes):
+        """ Intern nodes (name -> set of dependency names) """
+        if not isinstance(nodes, dict):
+            raise TypeError('"nodes" must be a dictionary')
+
+        names = list(nodes)
+        ids = dict((name, position) for (position, name) in enumerate(names))
+        count = len(names)
+
+        dependency_offsets = array('l', [0])
+        dependency_ids = array('l')
+        in_degrees = array('l')
+        dependent_counts = array('l', [0] * count)
+        undefined = {}
+        for name in names:
+            dependency_set = nodes[name]
+            # Dependencies on undefined names count towards the
+            # in-degree, so their dependents can never become ready.
+            in_degrees.append(len(dependency_set))
+            for dependency in dependency_set:
+                dependency_id = ids.get(dependency)
+                if dependency_id is None:
+                    undefined.setdefault(name, set()).add(dependency)
+                    continue
+                dependency_ids.append(dependency_id)
+                dependent_counts[dependency_id] += 1
+            dependency_offsets.append(len(dependency_ids))
+
+        # Reverse edges, filled by counting sort
+        dependent_offsets = array('l', [0] * (count + 1))
+        for position in xrange(count):
+            dependent_offsets[position + 1] = \
+                dependent_offsets[position] + dependent_counts[position]
+        dependent_ids = array('l', [0] * len(dependency_ids))
+        cursor = array('l', dependent_offsets[:count])
+        for position in xrange(count):
+            for offset in xrange(dependency_offsets[position],
+                                 dependency_offsets[position + 1]):
+                dependency_id = dependency_ids[offset]
+                dependent_ids[cursor[dependency_id]] = position
+                cursor[dependency_id] += 1
+
+        self._names = names
+        self._ids = ids
+        self._dependency_offsets = dependency_offsets
+        self._dependency_ids = dependency_ids
+        self._dependent_offsets = dependent_offsets
+        self._dependent_ids = dependent_ids
+        self._in_degrees = in_degrees
+        self._undefined = undefined
+        self._depths = None
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    @property
+    def names(self):
+        """ Return names by id """
+        return self._names
+
+    @property
+    def undefined(self):
+        """ Return undefined dependency names by service name """
+        return self._undefined
+
+    def get_id(self, name):
+        """ Return the id of a name """
+        return self._ids[name]
+
+    def get_name(self, node_id):
+        """ Return the name of an id """
+        return self._names[node_id]
+
+    def get_in_degree(self, node_id):
+        """ Return the number of dependencies of an id """
+        return self._in_degrees[node_id]
+
+    def get_dependency_ids(self, node_id):
+        """ Return ids of the (defined) dependencies of an id """
+        offsets = self._dependency_offsets
+        return self._dependency_ids[offsets[node_id]:offsets[node_id + 1]]
+
+    def get_dependent_ids(self, node_id):
+        """ Return ids of the services depending on an id """
+        offsets = self._dependent_offsets
+        return self._dependent_ids[offsets[node_id]:offsets[node_id + 1]]
+
+    def get_dependencies(self, name):
+        """ Return names of the (defined) dependencies of a name """
+        names = self._names
+        return [names[dependency_id] for dependency_id
+                in self.get_dependency_ids(self._ids[name])]
+
+    def get_dependents(self, name):
+        """ Return names of the services depending on a name """
+        names = self._names
+        return [names[dependent_id] for dependent_id
+                in self.get_dependent_ids(self._ids[name])]
+
+    def get_ancestor_ids(self, node_id):
+        """ Return ids of everything transitively depending on an id """
+        return self._walk([node_id], None, self._dependent_offsets,
+                          self._dependent_ids)[1:]
+
+    def get_descendant_ids(self, node_id):
+        """ Return ids of everything an id transitively depends on """
+        return self._walk([node_id], None, self._dependency_offsets,
+                          self._dependency_ids)[1:]
+
+    def get_ancestors(self, name):
+        """
+            Return names of everything transitively depending on a
+            name: what breaks if it changes
+        """
+        return self.get_names(self.get_ancestor_ids(self._ids[name]))
+
+    def get_descendants(self, name):
+        """ Return names of everything a name transitively depends on """
+        return self.get_names(self.get_descendant_ids(self._ids[name]))
+
+    @property
+    def depths(self):
+        """
+            Return the topological depth of every id: the length of
+            its longest chain of dependencies (0 without any)
+        """
+        if self._depths is None:
+            count = len(self._names)
+            offsets = self._dependency_offsets
+            # Undefined dependencies are left out, unlike in
+            # topological_ids(), so broken configs can be queried.
+            in_degrees = array('l', [
+                offsets[node_id + 1] - offsets[node_id]
+                for node_id in xrange(count)
+            ])
+            depths = array('l', [0]) * count
+            ready = deque(node_id for node_id in xrange(count)
+                          if in_degrees[node_id] == 0)
+            visited = 0
+            while ready:
+                node_id = ready.popleft()
+                visited += 1
+                for dependent_id in self.get_dependent_ids(node_id):
+                    if depths[node_id] >= depths[dependent_id]:
+                        depths[dependent_id] = depths[node_id] + 1
+                    in_degrees[dependent_id] -= 1
+                    if in_degrees[dependent_id] == 0:
+                        ready.append(dependent_id)
+            if visited != count:
+                raise Exception('Circular dependencies have no depth')
+            self._depths = depths
+        return self._depths
+
+    def get_depth(self, name):
+        """ Return the topological depth of a name """
+        return self.depths[self._ids[name]]
+
+    def topological_ids(self, node_ids=None):
+        """
+            Return ids ordered so every id follows its dependencies
+            (Kahn's algorithm over in-degree counters). When node_ids is
+            given only that subgraph is ordered; dependencies outside of
+            it are treated as already met, unless they are undefined.
+        """
+        count = len(self._names)
+        dependency_offsets = self._dependency_offsets
+        if node_ids is None:
+            node_ids = xrange(count)
+            members = None
+            in_degrees = array('l', self._in_degrees)
+        else:
+            members = bytearray(count)
+            for node_id in node_ids:
+                members[node_id] = 1
+            in_degrees = array('l', [0]) * count
+            dependency_ids = self._dependency_ids
+            for node_id in node_ids:
+                degree = len(self._undefined.get(self._names[node_id], ()))
+                for offset in xrange(dependency_offsets[node_id],
+                                     dependency_offsets[node_id + 1]):
+                    if members[dependency_ids[offset]]:
+                        degree += 1
+                in_degrees[node_id] = degree
+
+        ready = deque(node_id for node_id in node_ids
+                      if in_degrees[node_id] == 0)
+        order = array('l')
+        offsets = self._dependent_offsets
+        dependent_ids = self._dependent_ids
+        while ready:
+            node_id = ready.popleft()
+            order.append(node_id)
+            for offset in xrange(offsets[node_id], offsets[node_id + 1]):
+                dependent_id = dependent_ids[offset]
+                if members is not None and not members[dependent_id]:
+                    continue
+                in_degrees[dependent_id] -= 1
+                if in_degrees[dependent_id] == 0:
+                    ready.append(dependent_id)
+
+        # Anything left over is part of a cycle or
+        # depends on a service that is not defined.
+        if len(order) != len(node_ids):
+            raise Exception('No newly instantiated services')
+        return order
+
+    def topological_sort(self):
+        """ Return names ordered so every name follows its dependencies """
+        names = self._names
+        return [names[node_id] for node_id in self.topological_ids()]
+
+    def closure_ids(self, node_ids, skip=None):
+        """
+            Return node_ids plus every id they transitively depend on.
+            Ids marked in the skip bytearray are neither included
+            nor descended into.
+        """
+        return self._walk(node_ids, skip, self._dependency_offsets,
+                          self._dependency_ids)
+
+    def dependent_closure_ids(self, node_ids, skip=None):
+        """
+            Return node_ids plus every id that transitively
+            depends on them.
+        """
+        return self._walk(node_ids, skip, self._dependent_offsets,
+                          self._dependent_ids)
+
+    def _walk(self, node_ids, skip, offsets, edge_ids):
+        """ Collect everything reachable from node_ids along edges """
+        seen = bytearray(len(self._names))
+        if skip is not None:
+            seen[:] = skip
+        reached = []
+        for node_id in node_ids:
+            if not seen[node_id]:
+                seen[node_id] = 1
+                reached.append(node_id)
+        position = 0
+        while position < len(reached):
+            node_id = reached[position]
+            position += 1
+            for offset in xrange(offsets[node_id], offsets[node_id + 1]):
+                next_id = edge_ids[offset]
+                if not seen[next_id]:
+                    seen[next_id] = 1
+                    reached.append(next_id)
+        return reached
+
+    def mark(self, names):
+        """ Return a bytearray marking the ids of the names present """
+        marks = bytearray(len(self._names))
+        ids = self._ids
+        for name in names:
+            node_id = ids.get(name)
+            if node_id is not None:
+                marks[node_id] = 1
+        return marks
+
+    def get_names(self, node_ids):
+        """ Return the names of a sequence of ids """
+        names = self._names
+        return [names[node_id] for node_id in node_ids]
+
+
+def _bits(row):
+    """
+        Return the positions of the bits set in an integer, ascending.
+        Each of the k steps is an operation on the whole n bit integer,
+        so this costs O(k * n / word size).
+    """
+    positions = []
+    while row:
+        lowest = row & -row
+        positions.append(lowest.bit_length() - 1)
+        row ^= lowest
+    return positions
+
+
+class TransitiveClosure(object):
+    """
+        Precomputed transitive closure of a DependencyGraph: one bitset
+        row (an integer) of descendants and one of ancestors per id,
+        O(n^2) bits of memory. Operations on an n bit row cost
+        O(n / word size): a reachability test is one shift of a row,
+        and listing one costs that much per bit set. Both are far
+        cheaper than walking the graph, but neither is constant.
+    """
+    __slots__ = ('_graph', '_descendants', '_ancestors')
+
+    def __init__(self, graph):
+        """ Compute the rows in topological order """
+        depths = graph.depths
+        order = sorted(xrange(len(graph)), key=depths.__getitem__)
+        descendants = [0] * len(graph)
+        for node_id in order:
+            row = 0
+            for dependency_id in graph.get_dependency_ids(node_id):
+                row |= descendants[dependency_id] | (1 << dependency_id)
+            descendants[node_id] = row
+        ancestors = [0] * len(graph)
+        for node_id in reversed(order):
+            row = 0
+            for dependent_id in graph.get_dependent_ids(node_id):
+                row |= ancestors[dependent_id] | (1 << dependent_id)
+            ancestors[node_id] = row
+        self._graph = graph
+        self._descendants = descendants
+        self._ancestors = ancestors
+
+    def depends_on(self, name, dependency):
+        """ Returns true if name transitively depends on dependency """
+        graph = self._graph
+        row = self._descendants[graph.get_id(name)]
+        return bool(row >> graph.get_id(dependency) & 1)
+
+    def get_ancestor_ids(self, node_id):
+        """ Return ids of everything transitively depending on an id """
+        return _bits(self._ancestors[node_id])
+
+    def get_descendant_ids(self, node_id):
+        """ Return ids of everything an id transitively depends on """
+        return _bits(self._descendants[node_id])
+
+    def get_ancestors(self, name):
+        """ Return names of everything transitively depending on a name """
+        graph = self._graph
+        return graph.get_names(self.get_ancestor_ids(graph.get_id(name)))
+
+    def get_descendants(self, name):
+        """ Return names of everything a name transitively depends on """
+        graph = self._graph
+        return graph.get_names(self.get_descendant_ids(graph.get_id(name)))
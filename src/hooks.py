@@ -0,0 +1,61 @@
+""" Hooks Module """
+import json
+import os
+import threading
+import time
+
+
+class ChromeTraceCollector(object):
+    """
+        Instrumentation hook recording service phases as Chrome
+        trace events, viewable in chrome://tracing or Perfetto.
+    """
+    def __init__(self, clock=None):
+        """ Initialize Collector """
+        if clock is None:
+            clock = time.time
+        self._clock = clock
+        self._pid = os.getpid()
+        self._starts = {}
+        self._events = []
+
+    @property
+    def events(self):
+        """ Return completed trace events """
+        return self._events
+
+    def __call__(self, event, name, phase):
+        """ Record the start or end of a service phase """
+        now = self._clock()
+        thread_id = threading.current_thread().ident
+        key = (name, phase, thread_id)
+        if event == 'start':
+            self._starts[key] = now
+            return
+        start = self._starts.pop(key, None)
+        if start is None:
+            return
+        self._events.append({
+            'name': '%s %s' % (name, phase),
+            'cat': phase,
+            'ph': 'X',
+            'ts': int(start * 1000000),
+            'dur': int((now - start) * 1000000),
+            'pid': self._pid,
+            'tid': thread_id,
+            'args': {'service': name, 'phase': phase}
+        })
+
+    def get_durations(self, phase='service'):
+        """ Return seconds spent per service in a phase """
+        durations = {}
+        for event in self._events:
+            if event['cat'] == phase:
+                service = event['args']['service']
+                durations[service] = durations.get(service, 0) \
+                    + event['dur'] / 1000000.0
+        return durations
+
+    def write(self, output):
+        """ Write the trace as JSON to a file object """
+        json.dump({'traceEvents': self._events}, output)
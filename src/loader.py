@@ -0,0 +1,136 @@
+""" Loader Module """
+import hashlib
+import json
+import os
+
+import yaml
+
+from plan import read_pickle
+from plan import write_pickle
+
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+
+CACHE_VERSION = 1
+
+# Key of the files a config file merges in before its own services
+IMPORTS = 'imports'
+
+
+class ConfigLoadException(Exception):
+    """ Raised when config files cannot be merged """
+    def __init__(self, message):
+        super(ConfigLoadException, self).__init__()
+        self.message = message
+
+
+def _read(path):
+    """ Return the content of a file and its (mtime, size, sha1) """
+    with open(path, 'rb') as config_file:
+        content = config_file.read()
+    stat = os.stat(path)
+    return (content, (stat.st_mtime, stat.st_size,
+                      hashlib.sha1(content).hexdigest()))
+
+
+def parse(content, path='<string>'):
+    """ Parse YAML content holding a mapping of services """
+    config = yaml.load(content, Loader=YamlLoader)
+    if config is None:
+        return {}
+    if not isinstance(config, dict):
+        raise ConfigLoadException('"%s" must hold a mapping' % path)
+    return config
+
+
+def _merge(path, config, files, loading):
+    """ Merge the file at path, after the files it imports, into config """
+    path = os.path.abspath(path)
+    if path in loading:
+        raise ConfigLoadException('Circular import of "%s"' % path)
+    (content, files[path]) = _read(path)
+    services = parse(content, path)
+    imports = services.pop(IMPORTS, None) or []
+    if isinstance(imports, basestring):
+        imports = [imports]
+
+    loading.append(path)
+    for imported in imports:
+        _merge(os.path.join(os.path.dirname(path), imported),
+               config, files, loading)
+    loading.pop()
+    config.update(services)
+
+
+def _load(paths):
+    """ Merge files, returning the config and the signature of each file """
+    config = {}
+    files = {}
+    for path in paths:
+        _merge(path, config, files, [])
+    return (config, files)
+
+
+def _is_fresh(files):
+    """
+        Return true if no file changed. Files whose mtime changed are
+        hashed again, and their signature refreshed if still the same.
+    """
+    for (path, (mtime, size, digest)) in files.items():
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if (stat.st_mtime, stat.st_size) == (mtime, size):
+            continue
+        signature = _read(path)[1]
+        if signature[2] != digest:
+            return False
+        files[path] = signature
+    return True
+
+
+def get_cache_path(cache_dir, paths):
+    """ Path of the cached config merged from paths """
+    key = hashlib.sha1(json.dumps(
+        [CACHE_VERSION] + [os.path.abspath(path) for path in paths]
+    )).hexdigest()
+    return os.path.join(cache_dir, '%s.config' % key)
+
+
+def load_config(paths, cache_dir=None):
+    """
+        Load and merge YAML config files, later files overriding
+        services of earlier ones. A file may list files to merge in
+        before itself under "imports", relative to its own directory.
+        YAML is parsed with libyaml when PyYAML was built with it.
+
+        With cache_dir, the merged config is cached in a pickle keyed
+        by the paths, and reused while no file changed (same mtime and
+        size, or else same content hash).
+    """
+    if isinstance(paths, basestring):
+        paths = [paths]
+    if cache_dir is None:
+        return _load(paths)[0]
+
+    cache_path = get_cache_path(cache_dir, paths)
+    entry = read_pickle(cache_path)
+    if entry is not None and entry.get('version') == CACHE_VERSION:
+        signatures = dict(entry['files'])
+        if _is_fresh(signatures):
+            if signatures != entry['files']:
+                entry['files'] = signatures
+                write_pickle(cache_dir, cache_path, entry)
+            return entry['config']
+
+    (config, files) = _load(paths)
+    write_pickle(cache_dir, cache_path, {
+        'version': CACHE_VERSION,
+        'files': files,
+        'config': config
+    })
+    return config
@@ -0,0 +1,241 @@
+""" Plan Module """
+import hashlib
+import json
+import os
+import tempfile
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+
+PLAN_VERSION = 5
+
+
+def fingerprint(config, scalars=None):
+    """
+        Content hash of a service configuration and of the names of its
+        scalars (plans record scalar slots, never their values). None
+        if the config holds values JSON cannot encode, whose repr may
+        differ in every process: such configs are not cached.
+    """
+    if scalars is None:
+        scalars = {}
+    try:
+        content = json.dumps(
+            [PLAN_VERSION, config, sorted(scalars)],
+            sort_keys=True
+        )
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def get_modules(config):
+    """ Build the module name -> class names table of a config """
+    modules = {}
+    for conf in config.values():
+        if conf.get('module') is None:
+            continue
+        classes = modules.setdefault(conf['module'], set())
+        if conf.get('class') is not None:
+            classes.add(conf['class'])
+    return modules
+
+
+class ResolutionPlan(object):
+    """
+        Everything Resolver needs to instantiate a config without
+        analysing its dependency graph or argument trees again.
+    """
+    # pylint: disable=too-many-arguments
+    def __init__(self, order, nodes, modules, templates, scoped=None):
+        """ Initialize Plan """
+        if scoped is None:
+            scoped = frozenset()
+        if not isinstance(order, list):
+            raise TypeError('"order" must be a list')
+        if not isinstance(nodes, dict):
+            raise TypeError('"nodes" must be a dictionary')
+        if not isinstance(modules, dict):
+            raise TypeError('"modules" must be a dictionary')
+        if not isinstance(templates, dict):
+            raise TypeError('"templates" must be a dictionary')
+        self._order = order
+        self._nodes = nodes
+        self._modules = modules
+        self._templates = templates
+        self._scoped = scoped
+
+    @property
+    def order(self):
+        """ Return service names in instantiation order """
+        return self._order
+
+    @property
+    def nodes(self):
+        """ Return dependency sets by service name """
+        return self._nodes
+
+    @property
+    def modules(self):
+        """ Return class names by module name """
+        return self._modules
+
+    @property
+    def templates(self):
+        """ Return compiled ServiceTemplates by service name """
+        return self._templates
+
+    @property
+    def scoped(self):
+        """
+            Return the names of the request scoped services and of
+            everything depending on them, which parents never build
+        """
+        return self._scoped
+
+    def to_dict(self):
+        """ Serializable representation of the plan """
+        return {
+            'version': PLAN_VERSION,
+            'order': self._order,
+            'nodes': self._nodes,
+            'modules': self._modules,
+            'templates': self._templates,
+            'scoped': self._scoped
+        }
+
+    @classmethod
+    def from_dict(cls, dictionary):
+        """ Rebuild a plan from to_dict() output """
+        if dictionary.get('version') != PLAN_VERSION:
+            raise ValueError('Unsupported plan version')
+        return cls(
+            dictionary['order'],
+            dictionary['nodes'],
+            dictionary['modules'],
+            dictionary['templates'],
+            dictionary['scoped']
+        )
+
+
+class ScopePlan(object):
+    """
+        Instantiation plan of the request scoped subgraph of a
+        dependency graph: the request scoped services and everything
+        depending on them. Per service orders are memoized, so a child
+        container only ever walks the services it builds.
+    """
+    def __init__(self, graph, names):
+        """ Compute the subgraph of graph scoped by names """
+        ids = graph.dependent_closure_ids(
+            [graph.get_id(name) for name in names]
+        )
+        # Everything outside of the subgraph is taken from the parent
+        outside = bytearray([1]) * len(graph)
+        for node_id in ids:
+            outside[node_id] = 0
+        # Parent services the subgraph depends on
+        requires = set()
+        for node_id in ids:
+            for dependency_id in graph.get_dependency_ids(node_id):
+                if outside[dependency_id]:
+                    requires.add(graph.get_name(dependency_id))
+        self._graph = graph
+        self._outside = outside
+        self._order = graph.get_names(graph.topological_ids(ids))
+        self._names = frozenset(self._order)
+        self._requires = requires
+        self._orders = {}
+
+    @property
+    def names(self):
+        """ Return the names of every request scoped service """
+        return self._names
+
+    @property
+    def order(self):
+        """ Return request scoped service names in instantiation order """
+        return self._order
+
+    @property
+    def requires(self):
+        """ Return the names of the parent services the subgraph uses """
+        return self._requires
+
+    def get_order(self, name):
+        """
+            Return the request scoped services name needs (itself
+            included) in instantiation order
+        """
+        order = self._orders.get(name)
+        if order is None:
+            graph = self._graph
+            ids = graph.closure_ids([graph.get_id(name)], self._outside)
+            order = graph.get_names(graph.topological_ids(ids))
+            self._orders[name] = order
+        return order
+
+
+def get_plan_path(cache_dir, key):
+    """ Path of a cached plan """
+    return os.path.join(cache_dir, '%s.plan' % key)
+
+
+def load_plan(cache_dir, key):
+    """ Load a cached plan, or None if there is no usable one """
+    try:
+        with open(get_plan_path(cache_dir, key), 'rb') as plan_file:
+            return ResolutionPlan.from_dict(pickle.load(plan_file))
+    # pylint: disable=broad-except
+    except Exception:
+        # Missing, stale or corrupt caches are simply recompiled.
+        return None
+
+
+def save_plan(cache_dir, key, plan):
+    """
+        Atomically write a plan to the cache directory. Returns False,
+        caching nothing, if the plan cannot be written.
+    """
+    return write_pickle(cache_dir, get_plan_path(cache_dir, key),
+                        plan.to_dict())
+
+
+def read_pickle(path):
+    """ Load a pickled cache file, or None if there is no usable one """
+    try:
+        with open(path, 'rb') as cache_file:
+            return pickle.load(cache_file)
+    # pylint: disable=broad-except
+    except Exception:
+        return None
+
+
+def write_pickle(cache_dir, path, data):
+    """
+        Atomically pickle data to path, a file of cache_dir. Caches are
+        best effort: if data cannot be pickled or the directory cannot
+        be written, nothing is left behind and False is returned.
+    """
+    temp_path = None
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        (handle, temp_path) = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(handle, 'wb') as cache_file:
+            pickle.dump(data, cache_file, pickle.HIGHEST_PROTOCOL)
+        os.rename(temp_path, path)
+        temp_path = None
+        return True
+    # pylint: disable=broad-except
+    except Exception:
+        return False
+    finally:
+        if temp_path is not None:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
@@ -0,0 +1,44 @@
+""" Prefork Module """
+import gc
+import os
+import traceback
+
+
+def fork_workers(resolver, workers, serve, parallel=None, disable_gc=None):
+    """
+        Resolve the container once, then fork workers processes sharing
+        its services copy on write. Every worker runs the post-fork
+        methods, then serve(resolver), and exits with status 0 (1 if
+        anything raised). Returns the worker pids to the parent, where
+        the garbage collector is enabled again if Resolver.prefork()
+        disabled it (see disable_gc there); workers keep it off.
+    """
+    gc_enabled = gc.isenabled()
+    resolver.prefork(parallel, disable_gc)
+    try:
+        return _fork(resolver, workers, serve)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def _fork(resolver, workers, serve):
+    """ Fork the workers of fork_workers, returning their pids """
+    pids = []
+    for _ in xrange(workers):
+        pid = os.fork()
+        if pid:
+            pids.append(pid)
+            continue
+        status = 1
+        try:
+            resolver.after_fork()
+            serve(resolver)
+            status = 0
+        # pylint: disable=broad-except
+        except Exception:
+            traceback.print_exc()
+        finally:
+            # Never return into the parent's code
+            os._exit(status)  # pylint: disable=protected-access
+    return pids
@@ -0,0 +1,242 @@
+""" Report Module """
+from array import array
+
+from graph import DependencyGraph
+
+
+SEQUENTIAL = 'sequential'
+PARALLEL = 'parallel'
+
+# Slack below this many seconds counts as critical
+EPSILON = 1e-9
+
+
+def _finish_times(graph, order, costs):
+    """
+        Earliest finish time of every id when nothing waits on workers,
+        and the dependency each id waits for last (-1 if none)
+    """
+    finish = array('d', [0.0]) * len(graph)
+    critical = array('l', [-1]) * len(graph)
+    for node_id in order:
+        start = 0.0
+        for dependency_id in graph.get_dependency_ids(node_id):
+            if finish[dependency_id] > start:
+                start = finish[dependency_id]
+                critical[node_id] = dependency_id
+        finish[node_id] = start + costs[node_id]
+    return (finish, critical)
+
+
+class StartupReport(object):
+    """
+        Startup cost analysis of a dependency graph weighted with
+        measured per-service costs (in seconds).
+
+        In parallel mode services start as soon as their dependencies
+        are built, so boot time is the weighted critical path. Workers
+        are assumed unlimited: with fewer threads than independent
+        services, actual boot time can be longer. In sequential mode
+        boot time is the sum of all costs.
+    """
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, nodes, costs, mode=PARALLEL, top=10):
+        """ Analyse nodes (name -> dependency names) and costs """
+        if not isinstance(nodes, dict):
+            raise TypeError('"nodes" must be a dictionary')
+        if not isinstance(costs, dict):
+            raise TypeError('"costs" must be a dictionary')
+        if mode not in (SEQUENTIAL, PARALLEL):
+            raise ValueError('"mode" must be "%s" or "%s"'
+                             % (SEQUENTIAL, PARALLEL))
+
+        graph = DependencyGraph(nodes)
+        order = graph.topological_ids()
+        weights = array('d', [
+            float(costs.get(name, 0.0)) for name in graph.names
+        ])
+        self._mode = mode
+        self._costs = dict(zip(graph.names, weights))
+        if mode == SEQUENTIAL:
+            self._analyse_sequential(graph, order, weights, top)
+        else:
+            self._analyse_parallel(graph, order, weights, top)
+
+    def _analyse_sequential(self, graph, order, weights, top):
+        """ One service at a time: every service is on the path """
+        names = graph.names
+        self._total = sum(weights)
+        self._critical_path = [names[node_id] for node_id in order]
+        self._earliest_start = {}
+        elapsed = 0.0
+        for node_id in order:
+            self._earliest_start[names[node_id]] = elapsed
+            elapsed += weights[node_id]
+        self._slack = dict((name, 0.0) for name in names)
+        ranked = sorted(names, key=lambda name: -self._costs[name])
+        self._top = [(name, self._costs[name], self._costs[name])
+                     for name in ranked[:top]]
+
+    # pylint: disable=too-many-locals
+    def _analyse_parallel(self, graph, order, weights, top):
+        """ Forward and backward passes over the weighted graph """
+        names = graph.names
+        (finish, critical) = _finish_times(graph, order, weights)
+        total = max(finish) if len(finish) else 0.0
+
+        # Latest finish that does not delay the boot
+        latest = array('d', [total]) * len(graph)
+        for node_id in reversed(order):
+            for dependent_id in graph.get_dependent_ids(node_id):
+                start = latest[dependent_id] - weights[dependent_id]
+                if start < latest[node_id]:
+                    latest[node_id] = start
+
+        self._total = total
+        self._earliest_start = {}
+        self._slack = {}
+        for node_id in order:
+            name = names[node_id]
+            self._earliest_start[name] = finish[node_id] - weights[node_id]
+            self._slack[name] = max(latest[node_id] - finish[node_id], 0.0)
+
+        # Walk back from the last service to finish through the
+        # dependencies each service waited for last
+        path = []
+        if len(order):
+            node_id = max(order, key=lambda node_id: finish[node_id])
+            while node_id != -1:
+                path.append(names[node_id])
+                node_id = critical[node_id]
+        self._critical_path = path[::-1]
+
+        # Only critical services can cut boot time; measure how much
+        # making each of the most expensive ones free would save.
+        critical = [node_id for node_id in order
+                    if weights[node_id] and
+                    self._slack[names[node_id]] < EPSILON]
+        candidates = sorted(critical,
+                            key=lambda node_id: -weights[node_id])[:top]
+        saved = []
+        for node_id in candidates:
+            cost = weights[node_id]
+            weights[node_id] = 0.0
+            without = max(_finish_times(graph, order, weights)[0])
+            weights[node_id] = cost
+            saved.append((names[node_id], cost, total - without))
+        saved.sort(key=lambda item: (-item[2], -item[1]))
+        self._top = saved
+
+    @property
+    def mode(self):
+        """ Return the instantiation mode analysed """
+        return self._mode
+
+    @property
+    def total(self):
+        """ Return the estimated boot time in seconds """
+        return self._total
+
+    @property
+    def critical_path(self):
+        """ Return the chain of services bounding boot time """
+        return self._critical_path
+
+    @property
+    def earliest_start(self):
+        """ Return the earliest start time of every service """
+        return self._earliest_start
+
+    @property
+    def slack(self):
+        """ Return how long each service could take longer for free """
+        return self._slack
+
+    @property
+    def top(self):
+        """
+            Return (name, cost, saving) tuples for the services whose
+            speed-up would cut boot time the most
+        """
+        return self._top
+
+    def to_dict(self):
+        """ Serializable representation of the report """
+        return {
+            'mode': self._mode,
+            'total': self._total,
+            'critical_path': self._critical_path,
+            'slack': self._slack,
+            'earliest_start': self._earliest_start,
+            'costs': self._costs,
+            'top': [
+                {'service': name, 'cost': cost, 'saving': saving}
+                for (name, cost, saving) in self._top
+            ]
+        }
+
+    def format(self):
+        """ Human readable summary """
+        estimate = 'Estimated %s boot time: %.6fs' % (self._mode, self._total)
+        if self._mode == PARALLEL:
+            estimate += ' (assuming unlimited workers)'
+        lines = [
+            estimate,
+            'Critical path: %s' % ' -> '.join(self._critical_path),
+            '',
+            '%-40s %12s %12s %12s' % ('service', 'cost', 'saving', 'slack')
+        ]
+        for (name, cost, saving) in self._top:
+            lines.append('%-40s %11.6fs %11.6fs %11.6fs' % (
+                name, cost, saving, self._slack[name]
+            ))
+        return '\n'.join(lines)
+
+
+class CloseReport(object):
+    """ Outcome of closing services, with per-service latencies """
+    def __init__(self, latencies, errors, timed_out):
+        """ Initialize Report """
+        self._latencies = latencies
+        self._errors = errors
+        self._timed_out = timed_out
+
+    @property
+    def latencies(self):
+        """ Return seconds spent closing each service """
+        return self._latencies
+
+    @property
+    def errors(self):
+        """ Return the exception raised closing each failed service """
+        return self._errors
+
+    @property
+    def timed_out(self):
+        """ Return names of the services that missed their deadline """
+        return self._timed_out
+
+    def to_dict(self):
+        """ Serializable representation of the report """
+        return {
+            'latencies': self._latencies,
+            'errors': dict((name, repr(error))
+                           for (name, error) in self._errors.iteritems()),
+            'timed_out': self._timed_out
+        }
+
+    def format(self):
+        """ Human readable summary, slowest services first """
+        lines = ['%-40s %12s %s' % ('service', 'latency', 'status')]
+        ranked = sorted(self._latencies,
+                        key=lambda name: -self._latencies[name])
+        for name in ranked:
+            status = 'ok'
+            if name in self._timed_out:
+                status = 'timed out'
+            elif name in self._errors:
+                status = 'error: %r' % self._errors[name]
+            lines.append('%-40s %11.6fs %s' % (
+                name, self._latencies[name], status
+            ))
+        return '\n'.join(lines)
@@ -1,35 +1,92 @@
 """ Resolver module """
+import gc
+import threading
+from array import array
+from collections import deque
+from contextlib import contextmanager
+from itertools import chain
+
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from child import ChildResolver
+from graph import DependencyGraph
+from graph import TransitiveClosure
+
+from plan import fingerprint
+from plan import get_modules
+from plan import load_plan
+from plan import ResolutionPlan
+from plan import save_plan
+from plan import ScopePlan
+from services import InvalidServiceConfiguration
 from services import ServiceFactory
+from services import ServicePool
+from teardown import close_services
+from template import POOLED
+from template import PROTOTYPE
+from template import REQUEST
+from template import SCOPES
+from template import ServiceTemplate
+from tree import CompactDependencyTree
 from tree import DependencyNode
 from tree import DependencyTree
+from validation import ConfigValidationException
+from validation import validate_templates
 
 
 class CircularDependencyException(Exception):
     """ Raised when a circular dependency graph is detected """
-    def __init__(self, nodes):
+    def __init__(self, nodes, cycles=None):
         super(CircularDependencyException, self).__init__()
+        if cycles is None:
+            cycles = [(set(nodes), list(nodes))]
         self.node_path = '->'.join(nodes)
-        self.message = "Circular Depedency Detected: %s" % self.node_path
+        self.cycles = cycles
+        self.node_paths = ['->'.join(path) for (_, path) in cycles]
+        self.message = "Circular Depedency Detected: %s" % (
+            ', '.join(self.node_paths)
+        )
 
 
-def detect_circle(nodes):
-    """ Wrapper for recursive _detect_circle function """
+def detect_circle(nodes, compact=False):
+    """
+        Wrapper for the _detect_circle depth-first search. With compact
+        set, circles are found with find_cycles and an array-backed
+        CompactDependencyTree is returned instead.
+    """
     # Verify nodes and traveled types
     if not isinstance(nodes, dict):
         raise TypeError('"nodes" must be a dictionary')
 
+    if compact:
+        cycles = find_cycles(nodes)
+        if cycles:
+            raise CircularDependencyException(cycles[0][1], cycles)
+        return CompactDependencyTree.from_nodes(nodes)
+
     dependencies = set(nodes.keys())
     traveled = []
 
-    heads = _detect_circle(nodes, dependencies, traveled)
+    try:
+        heads = _detect_circle(nodes, dependencies, traveled)
+    except CircularDependencyException as exception:
+        # Report every circle at once, not only the first one found.
+        raise CircularDependencyException(
+            exception.node_path.split('->'),
+            find_cycles(nodes)
+        )
 
     return DependencyTree(heads)
 
 
 def _detect_circle(nodes=None, dependencies=None, traveled=None, path=None):
     """
-        Recursively iterate over nodes checking
-        if we've traveled to that node before.
+        Iterative white/grey/black depth-first search over nodes.
+        Grey nodes are on the current path, so reaching one again
+        means we've found a circle. Black nodes are fully explored and
+        their DependencyNode is shared by every path that reaches them,
+        which keeps the search (and the tree it builds) O(V+E).
     """
     # Verify nodes and traveled types
     if nodes is None:
@@ -47,39 +104,189 @@ def _detect_circle(nodes=None, dependencies=None, traveled=None, path=None):
     if path is None:
         path = []
 
-    if not dependencies:
-        # We're at the end of a dependency path.
-        return []
+    # Path is used for circular dependency exceptions
+    # to display to the user the circular path.
+    path = list(path)
+    grey = set(traveled)
+    black = {}
 
-    # Recursively iterate over nodes,
-    # and gather dependency children nodes.
     children = []
     for name in dependencies:
-        # Path is used for circular dependency exceptions
-        # to display to the user the circular path.
-        new_path = list(path)
-        new_path.append(name)
-
-        # Check if we've traveled to this node before.
-        if name in traveled:
-            raise CircularDependencyException(new_path)
-
-        # Make recursive call
-        node_children = _detect_circle(nodes=nodes,
-                                       dependencies=nodes[name],
-                                       traveled=traveled + list(name),
-                                       path=new_path)
-
-        # Create node for this dependency with children.
-        node = DependencyNode(name)
-        for child in node_children:
-            child.parent = node
-            node.add_child(child)
-        children.append(node)
-
+        children.append(_visit(nodes, name, path, grey, black))
     return children
 
 
+def _visit(nodes, start, path, grey, black):
+    """ Explore start depth-first and return its (memoized) node """
+    if start in black:
+        return black[start]
+    if start in grey:
+        raise CircularDependencyException(path + [start])
+
+    grey.add(start)
+    path.append(start)
+    stack = [(start, iter(nodes[start]))]
+    while stack:
+        (name, dependencies) = stack[-1]
+        for dependency in dependencies:
+            if dependency in black:
+                continue
+            if dependency in grey:
+                raise CircularDependencyException(path + [dependency])
+            grey.add(dependency)
+            path.append(dependency)
+            stack.append((dependency, iter(nodes[dependency])))
+            break
+        else:
+            # Every dependency is black: build this node from theirs.
+            stack.pop()
+            path.pop()
+            grey.discard(name)
+            node = DependencyNode(name)
+            for dependency in nodes[name]:
+                child = black[dependency]
+                if child.parent is None:
+                    child.parent = node
+                node.add_child(child)
+            black[name] = node
+
+    return black[start]
+
+
+class UnknownServiceException(Exception):
+    """ Raised when a service name is not defined in the config """
+    def __init__(self, names):
+        super(UnknownServiceException, self).__init__()
+        self.names = names
+        self.message = "Unknown Services: %s" % ', '.join(names)
+
+
+class RequestScopeException(Exception):
+    """ Raised when a request scoped service is asked of a parent """
+    def __init__(self, name):
+        super(RequestScopeException, self).__init__()
+        self.name = name
+        self.message = (
+            'Service "%s" is request scoped, get it from a child' % name
+        )
+
+
+def get_closure(nodes, names, skip=None):
+    """
+        Return names plus everything they transitively depend on,
+        in one linear walk. Names in skip are neither included
+        nor descended into.
+    """
+    if not isinstance(nodes, dict):
+        raise TypeError('"nodes" must be a dictionary')
+    return _get_closure(DependencyGraph(nodes), names, skip)
+
+
+def _get_closure(graph, names, skip=None):
+    """ get_closure() over an already interned graph """
+    unknown = [name for name in names if name not in graph]
+    if unknown:
+        raise UnknownServiceException(unknown)
+
+    node_ids = [graph.get_id(name) for name in names]
+    skip_marks = None if skip is None else graph.mark(skip)
+    return set(graph.get_names(graph.closure_ids(node_ids, skip_marks)))
+
+
+def get_dependent_closure(nodes, names):
+    """
+        Return names plus everything that transitively
+        depends on them, in one linear walk.
+    """
+    if not isinstance(nodes, dict):
+        raise TypeError('"nodes" must be a dictionary')
+    graph = DependencyGraph(nodes)
+    node_ids = [graph.get_id(name) for name in names if name in graph]
+    return set(graph.get_names(graph.dependent_closure_ids(node_ids)))
+
+
+# pylint: disable=too-many-branches
+def find_cycles(nodes):
+    """
+        Find every circle in nodes in a single linear pass using
+        Tarjan's strongly connected components algorithm.
+        Returns a list of (component, path) tuples, one per circular
+        component, where path is a representative circle through it.
+    """
+    if not isinstance(nodes, dict):
+        raise TypeError('"nodes" must be a dictionary')
+
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    components = []
+
+    for root in nodes:
+        if root in index:
+            continue
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(nodes[root]))]
+        while work:
+            (name, dependencies) = work[-1]
+            for dependency in dependencies:
+                if dependency not in nodes:
+                    continue
+                if dependency not in index:
+                    index[dependency] = lowlink[dependency] = len(index)
+                    stack.append(dependency)
+                    on_stack.add(dependency)
+                    work.append((dependency, iter(nodes[dependency])))
+                    break
+                elif dependency in on_stack:
+                    lowlink[name] = min(lowlink[name], index[dependency])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[name])
+                if lowlink[name] != index[name]:
+                    continue
+                # name is the root of a strongly connected component
+                component = set()
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.add(member)
+                    if member == name:
+                        break
+                if len(component) > 1 or name in nodes[name]:
+                    components.append(component)
+
+    return [
+        (component, _cycle_path(nodes, component))
+        for component in components
+    ]
+
+
+def _cycle_path(nodes, component):
+    """ Breadth-first search for a circle through a component """
+    start = min(component)
+    previous = {}
+    queue = deque([start])
+    while queue:
+        name = queue.popleft()
+        for dependency in nodes[name]:
+            if dependency == start:
+                # Walk back from the closing edge to start
+                trail = []
+                while name != start:
+                    trail.append(name)
+                    name = previous[name]
+                return [start] + trail[::-1] + [start]
+            if dependency in component and dependency not in previous:
+                previous[dependency] = name
+                queue.append(dependency)
+    return [start, start]
+
+
 def solve(nodes):
     """ Solve graph into Solution """
     # Verify nodes type
@@ -90,6 +297,18 @@ def solve(nodes):
     return detect_circle(nodes)
 
 
+def topological_sort(nodes):
+    """
+        Order node names so that every name follows its dependencies.
+        Uses in-degree counters and a reverse-adjacency index
+        (Kahn's algorithm), so it runs in O(V+E) without recursion.
+    """
+    if not isinstance(nodes, dict):
+        raise TypeError('"nodes" must be a dictionary')
+
+    return DependencyGraph(nodes).topological_sort()
+
+
 def is_dependency_name(name):
     """ Returns true if of the form "@some_string" """
     if not isinstance(name, str):
@@ -97,127 +316,547 @@ def is_dependency_name(name):
     return name[0:1] == '@'
 
 
+# Resolver state update() replaces, restored if the update is rejected
+_UPDATE_STATE = ('_config', '_plan', '_graph', '_closure', '_scope_plan',
+                 '_scope_ready', '_cache_key')
+
+
 class Resolver(object):
     """ Resolves dependency node graph and instantiates services """
-    def __init__(self, config, scalars=None):
-        """ Initialize Resolver """
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, config, scalars=None, cache_dir=None,
+                 lookup_cache=None):
+        """
+            Initialize Resolver. When cache_dir is given, a plan
+            compiled for the same config and scalars is loaded from it
+            and the dependency graph is not analysed again.
+            lookup_cache may be shared (e.g. SHARED_LOOKUP_CACHE) to
+            reuse imported modules and classes across resolvers.
+        """
         if scalars is None:
             scalars = {}
         self._nodes = {}
+        self._graph = None
+        self._closure = None
+        self._templates = {}
         self._config = config
-        self._factory = ServiceFactory(scalars)
-        self._init_nodes(config)
+        self._factory = ServiceFactory(scalars, lookup_cache)
+        self._plan = None
+        self._scope_plan = None
+        self._scope_ready = False
+        # Guards lazy builds, so concurrent get() calls (e.g. from
+        # child containers) never build a service twice
+        self._lock = threading.RLock()
+        self._cache_dir = cache_dir
+        self._cache_key = None
+        if cache_dir is not None:
+            self._cache_key = fingerprint(config, scalars)
+        if self._cache_key is not None:
+            self._plan = load_plan(cache_dir, self._cache_key)
+        if self._plan is not None:
+            self._nodes = self._plan.nodes
+            self._templates = self._plan.templates
+        else:
+            self._init_nodes(config)
 
     @property
     def nodes(self):
         """ Return nodes """
         return self._nodes
 
+    @property
+    def graph(self):
+        """ Return the interned DependencyGraph of the nodes """
+        if self._graph is None:
+            self._graph = DependencyGraph(self._nodes)
+        return self._graph
+
+    @property
+    def closure(self):
+        """
+            Return the TransitiveClosure of the graph, for configs
+            queried for reachability many times
+        """
+        if self._closure is None:
+            self._closure = TransitiveClosure(self.graph)
+        return self._closure
+
+    @property
+    def scope_plan(self):
+        """
+            Return the ScopePlan of the request scoped services
+            and of everything depending on them
+        """
+        if self._scope_plan is None:
+            self._scope_plan = ScopePlan(self.graph, [
+                name for (name, template) in self._templates.iteritems()
+                if template.scope == REQUEST
+            ])
+        return self._scope_plan
+
+    def child(self, services=None, scalars=None):
+        """
+            Return a ChildResolver for one request. services (e.g. the
+            request itself) and scalars overlay the parent's.
+        """
+        with self._lock:
+            if not self._scope_ready:
+                # Build everything outside the request scope up front,
+                # so children only ever read from the parent
+                self.do()
+                self._scope_ready = True
+        return ChildResolver(self, services, scalars)
+
+    def add_hook(self, hook):
+        """
+            Register an instrumentation hook called with
+            (event, service name, phase) for every service phase
+        """
+        self._factory.hooks.append(hook)
+
+    @property
+    def lookup_stats(self):
+        """ Return module/class lookup cache hit and miss counters """
+        return self._factory.lookup_cache.stats
+
+    def compile(self):
+        """
+            Compile the resolution plan, writing it
+            to the cache directory if there is one.
+        """
+        if self._plan is None:
+            self._plan = ResolutionPlan(
+                self.graph.topological_sort(),
+                self._nodes,
+                get_modules(self._config),
+                self._templates,
+                self.scope_plan.names
+            )
+            if self._cache_key is not None:
+                save_plan(self._cache_dir, self._cache_key, self._plan)
+        return self._plan
+
     # pylint: disable=invalid-name
-    def do(self):
-        """ Instantiate Services """
+    def do(self, parallel=None, only=None):
+        """
+            Instantiate Services. With parallel set to a number of
+            threads, independent services are built concurrently.
+            With only set to service names, just those and what they
+            transitively depend on are built (and imported).
+        """
         if not self._nodes:
+            if only:
+                raise UnknownServiceException(list(only))
             return
-        # Let's retain original copy of _nodes
-        node_copy = dict(self._nodes)
-
-        self._do(node_copy)
+        with self._lock:
+            closure = None
+            if only is None:
+                order = self.compile().order
+            else:
+                # The rest of the graph needn't even be valid
+                closure = self._get_closure_ids(only)
+                order = self.graph.get_names(
+                    self.graph.topological_ids(closure)
+                )
+            if parallel:
+                self._do_parallel(order, parallel, closure)
+            else:
+                self._do(order)
 
         return self._factory.get_instantiated_services()
 
-    def _do(self, nodes):
-        """ Recursive method to instantiate services """
-        if not isinstance(nodes, dict):
-            raise TypeError('"nodes" must be a dictionary')
-
-        if not nodes:
-            # we're done!
+    def get(self, name):
+        """
+            Return a single service, instantiating only it and the
+            services it transitively depends on (if not done already).
+        """
+        if not self._factory.is_available(name):
+            self._build([name])
+        return self._factory.get_instantiated_service(name)
+
+    @contextmanager
+    def borrow(self, name, timeout=None):
+        """
+            Context manager handing out an instance of a service: a
+            pooled instance for the duration of the with block, a new
+            instance for prototypes and the instance for singletons.
+        """
+        service = self.get(name)
+        if self._templates[name].scope != POOLED:
+            yield service
             return
-        starting_num_nodes = len(nodes)
-        newly_instantiated = set()
+        with service.borrowed(timeout) as instance:
+            yield instance
+
+    # pylint: disable=too-many-locals
+    def update(self, changed_config=None, changed_scalars=None):
+        """
+            Apply changed service configs and scalars, rebuilding only
+            the instantiated services they affect: the changed services
+            and everything downstream of them. The rebuild is checked
+            first: if it cannot be ordered (unknown services, request
+            scoped or circular dependencies) the exception is raised and
+            nothing changes. Otherwise the replaced instances are closed,
+            as by close() (errors are ignored), and built anew. Returns
+            the rebuilt names.
+        """
+        if changed_config is None:
+            changed_config = {}
+        if changed_scalars is None:
+            changed_scalars = {}
+        if not isinstance(changed_config, dict):
+            raise TypeError('"changed_config" must be a dictionary')
+        if not isinstance(changed_scalars, dict):
+            raise TypeError('"changed_scalars" must be a dictionary')
+
+        changed = set(
+            name for (name, conf) in changed_config.iteritems()
+            if self._config.get(name) != conf
+        )
+        scalars = self._factory.scalars
+        changed_scalar_names = set(
+            name for (name, value) in changed_scalars.iteritems()
+            if name not in scalars or scalars[name] != value
+        )
+        if changed_scalar_names:
+            for (name, template) in self._templates.iteritems():
+                if template.scalars & changed_scalar_names:
+                    changed.add(name)
+        if not changed and not changed_scalar_names:
+            return set()
 
-        # Instantiate services with an empty dependency set
-        for (name, dependency_set) in nodes.iteritems():
-            if dependency_set:
-                # Skip non-empty dependency sets
+        with self._lock:
+            saved = self._save_update_state(changed, changed_scalars)
+            # Replaced instances close with the templates they were built by
+            stale = saved[1]
+            try:
+                # Apply the changes and re-parse only the changed services
+                config = dict(self._config)
+                config.update(changed_config)
+                self._config = config
+                scalars.update(changed_scalars)
+                self._init_nodes(dict((name, config[name])
+                                      for name in changed))
+                self._plan = None
+                self._graph = None
+                self._closure = None
+                self._scope_plan = None
+                self._scope_ready = False
+                if self._cache_dir is not None:
+                    self._cache_key = fingerprint(config, scalars)
+
+                factory = self._factory
+                graph = self.graph
+                affected = graph.get_names(graph.dependent_closure_ids(
+                    [graph.get_id(name) for name in changed]
+                ))
+                rebuild = set(name for name in affected
+                              if factory.is_available(name))
+                order = graph.get_names(graph.topological_ids(
+                    self._get_closure_ids(rebuild, rebuilt=rebuild)
+                ))
+            except Exception:
+                self._restore_update_state(saved)
+                raise
+
+            replaced = [name for name in rebuild
+                        if name in factory.instantiated_services]
+            templates = dict((name, stale.get(name) or self._templates[name])
+                             for name in replaced)
+            close_services(graph, templates, factory, replaced)
+            for name in rebuild:
+                factory.instantiated_services.pop(name, None)
+                factory.providers.pop(name, None)
+            self._do(order)
+        return rebuild
+
+    def _save_update_state(self, names, scalars):
+        """
+            Capture what update() is about to change: the resolver
+            state, the templates and nodes of names and the scalars
+        """
+        values = self._factory.scalars
+        return (
+            dict((attribute, getattr(self, attribute))
+                 for attribute in _UPDATE_STATE),
+            dict((name, self._templates.get(name)) for name in names),
+            dict((name, self._nodes.get(name)) for name in names),
+            dict((name, (name in values, values.get(name)))
+                 for name in scalars)
+        )
+
+    def _restore_update_state(self, saved):
+        """ Undo a rejected update() """
+        (state, templates, nodes, scalars) = saved
+        for (attribute, value) in state.iteritems():
+            setattr(self, attribute, value)
+        for (store, saved_values) in ((self._templates, templates),
+                                      (self._nodes, nodes)):
+            for (name, value) in saved_values.iteritems():
+                if value is None:
+                    store.pop(name, None)
+                else:
+                    store[name] = value
+        values = self._factory.scalars
+        for (name, (present, value)) in scalars.iteritems():
+            if present:
+                values[name] = value
+            else:
+                values.pop(name, None)
+
+    def close(self, parallel=None, timeout=None):
+        """
+            Call the "close-method" of every instantiated service,
+            dependents before their dependencies. Up to parallel
+            independent services are closed at once, each given timeout
+            seconds. Returns a CloseReport; closed services are
+            forgotten, so a later do() builds them anew.
+        """
+        factory = self._factory
+        report = close_services(self.graph, self._templates, factory,
+                                list(factory.instantiated_services),
+                                parallel, timeout)
+        factory.instantiated_services = {}
+        factory.providers = {}
+        self._scope_ready = False
+        return report
+
+    def validate(self, signatures=False, raise_errors=False):
+        """
+            Check the whole config before any constructor runs, and
+            return every problem found (see validate_templates), plus
+            circular dependencies. With signatures, constructors,
+            factory methods and calls must accept their arguments.
+            With raise_errors, a ConfigValidationException holding the
+            problems is raised instead.
+        """
+        errors = validate_templates(self._templates, self._factory,
+                                    self._nodes, signatures)
+        for (_, path) in find_cycles(self._nodes):
+            errors.append('Circular dependency: %s' % ' -> '.join(path))
+        if errors and raise_errors:
+            raise ConfigValidationException(errors)
+        return errors
+
+    def prefork(self, parallel=None, disable_gc=None):
+        """
+            Build every service ahead of forking worker processes, and
+            keep collections in workers from writing to (and un-sharing)
+            the pages of surviving objects: they are frozen out of the
+            collector's reach with gc.freeze() where available. Without
+            it (Python 2) the collector is disabled instead, and stays
+            off in forked workers; disable_gc=False keeps it running and
+            disable_gc=True disables it even where gc.freeze() exists.
+        """
+        services = self.do(parallel)
+        gc.collect()
+        can_freeze = hasattr(gc, 'freeze')
+        if can_freeze:
+            gc.freeze()  # pylint: disable=no-member
+        if disable_gc or (disable_gc is None and not can_freeze):
+            gc.disable()
+        return services
+
+    def after_fork(self):
+        """
+            Run the "post-fork-method" of every instantiated service,
+            dependencies first, in a freshly forked worker
+        """
+        factory = self._factory
+        services = factory.instantiated_services
+        for name in self.compile().order:
+            template = self._templates[name]
+            if name not in services:
                 continue
-
-            # Instantiate
-            config = self._config[name]
-            service = self._factory.create_from_dict(config)
-            self._factory.add_instantiated_service(name, service)
-
-            newly_instantiated.add(name)
-
-        # We ALWAYS should have instantiated a new service
-        # or we'll end up in an infinite loop.
-        if not newly_instantiated:
-            raise Exception('No newly instantiated services')
-
-        # Remove from Nodes
-        for name in newly_instantiated:
-            del nodes[name]
-
-        # Check if the number of nodes have changed
-        # to prevent infinite loops.
-        # We should ALWAYS have removed a node.
-        if starting_num_nodes == len(nodes):
-            raise Exception('No nodes removed!')
-
-        # Remove newly instantiated services from dependency sets
-        for (name, dependency_set) in nodes.iteritems():
-            nodes[name] = dependency_set.difference(newly_instantiated)
-
-        # Recursion is recursion is ...
-        self._do(nodes)
+            if template.scope == POOLED:
+                instances = services[name].after_fork()
+            else:
+                instances = [services[name]]
+            if template.post_fork_method is None:
+                continue
+            if factory.hooks:
+                factory.emit('start', name, 'post-fork')
+            for instance in instances:
+                getattr(instance, template.post_fork_method)()
+            if factory.hooks:
+                factory.emit('end', name, 'post-fork')
+
+    def _build(self, names):
+        """ Instantiate names and whatever they need that isn't built """
+        with self._lock:
+            graph = self.graph
+            closure = self._get_closure_ids(names)
+            self._do(graph.get_names(graph.topological_ids(closure)))
+
+    def _get_closure_ids(self, names, rebuilt=()):
+        """
+            Return the ids of names and of everything they transitively
+            depend on that isn't built (or is among rebuilt), in one
+            pass over the graph. Unknown names, undefined dependencies
+            and request scoped names are all reported before anything
+            gets built.
+        """
+        graph = self.graph
+        unknown = [name for name in names if name not in graph]
+        if unknown:
+            raise UnknownServiceException(unknown)
+        scoped = self._get_scoped_names()
+        for name in names:
+            if name in scoped:
+                raise RequestScopeException(name)
+
+        skip = self._get_available_marks()
+        for name in rebuilt:
+            skip[graph.get_id(name)] = 0
+        closure = graph.closure_ids([graph.get_id(name) for name in names],
+                                    skip)
+        undefined = set()
+        for node_id in closure:
+            undefined.update(graph.undefined.get(graph.get_name(node_id), ()))
+        if undefined:
+            raise UnknownServiceException(sorted(undefined))
+        return closure
+
+    def _get_pending_in_degrees(self, node_ids=None):
+        """
+            Return in-degree counters (indexed by graph id) counting
+            only the dependencies still to be built, and the ids of the
+            services still to be built (out of node_ids, if given).
+        """
+        graph = self.graph
+        instantiated = self._get_available_marks()
+        in_degrees = array('l', [0]) * len(graph)
+        pending = []
+        if node_ids is None:
+            node_ids = xrange(len(graph))
+        for node_id in node_ids:
+            if instantiated[node_id]:
+                continue
+            pending.append(node_id)
+            in_degrees[node_id] = graph.get_in_degree(node_id) - len([
+                dependency_id
+                for dependency_id in graph.get_dependency_ids(node_id)
+                if instantiated[dependency_id]
+            ])
+        return (in_degrees, pending)
+
+    def _get_available_marks(self):
+        """
+            Mark the graph ids of services not to build: those usable
+            as dependencies already and the request scoped ones
+        """
+        factory = self._factory
+        return self.graph.mark(chain(factory.get_instantiated_services(),
+                                     factory.providers,
+                                     self._get_scoped_names()))
+
+    def _get_scoped_names(self):
+        """
+            Return the names of the services parents never build,
+            taken from the compiled plan when there is one so warm
+            starts need no graph analysis
+        """
+        if self._plan is not None:
+            return self._plan.scoped
+        return self.scope_plan.names
+
+    def _do(self, order):
+        """ Instantiate services in plan order """
+        if not isinstance(order, list):
+            raise TypeError('"order" must be a list')
+
+        factory = self._factory
+        scoped = self._get_scoped_names()
+        for name in order:
+            if not factory.is_available(name) and name not in scoped:
+                self._provide(name)
+
+    def _provide(self, name):
+        """
+            Make a service available to its dependents according to
+            its scope: build the singleton, register a prototype
+            provider or build and prewarm the pool.
+        """
+        template = self._templates[name]
+        factory = self._factory
+        if template.scope == PROTOTYPE:
+            factory.add_provider(name, lambda: self._create(name))
+        elif template.scope == POOLED:
+            pool = ServicePool(lambda: self._create(name),
+                               template.pool_min, template.pool_max)
+            pool.prewarm()
+            factory.add_instantiated_service(name, pool)
+        else:
+            factory.add_instantiated_service(name, self._create(name))
+
+    def _create(self, name):
+        """ Create one service from its compiled template """
+        return self._factory.create_service(self._templates[name], name)
+
+    # pylint: disable=too-many-locals, too-many-branches
+    def _do_parallel(self, order, max_workers, node_ids=None):
+        """
+            Instantiate services (all, or those of node_ids) on a
+            thread pool. Each service is submitted as soon as its last
+            dependency has been built.
+        """
+        graph = self.graph
+        (in_degrees, pending) = self._get_pending_in_degrees(node_ids)
+
+        errors = {}
+        running = {}
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        def _submit(node_id):
+            """ Submit a service whose dependencies are all built """
+            running[executor.submit(
+                self._provide, graph.get_name(node_id)
+            )] = node_id
+
+        try:
+            for node_id in pending:
+                if in_degrees[node_id] == 0:
+                    _submit(node_id)
+
+            while running:
+                (done, _) = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node_id = running.pop(future)
+                    name = graph.get_name(node_id)
+                    if future.exception() is not None:
+                        errors[name] = future
+                        continue
+                    if errors:
+                        # Let running services finish, start nothing new
+                        continue
+                    for dependent_id in graph.get_dependent_ids(node_id):
+                        in_degrees[dependent_id] -= 1
+                        if in_degrees[dependent_id] == 0:
+                            _submit(dependent_id)
+        finally:
+            executor.shutdown(wait=True)
+
+        if errors:
+            # Raise the failure that comes first in plan order,
+            # whichever thread happened to fail first.
+            for name in order:
+                if name in errors:
+                    errors[name].result()
 
     def _init_nodes(self, config):
-        """ Gathers dependency sets onto _nodes """
+        """
+            Compiles a ServiceTemplate per service and gathers
+            dependency sets from their service slots onto _nodes
+        """
         if not isinstance(config, dict):
             raise TypeError('"config" must be a dictionary')
 
         for (name, conf) in config.iteritems():
-            args = [] if 'args' not in conf else conf['args']
-            kwargs = {} if 'kwargs' not in conf else conf['kwargs']
-
-            dependencies = set()
-            arg_deps = self._get_dependencies_from_args(args)
-            kwarg_deps = self._get_dependencies_from_kwargs(kwargs)
-
-            dependencies.update(arg_deps)
-            dependencies.update(kwarg_deps)
-
-            self._nodes[name] = dependencies
-
-    def _get_dependencies_from_args(self, args):
-        """ Parse arguments """
-        if not isinstance(args, list):
-            raise TypeError('"args" must be a list')
-
-        dependency_names = set()
-        for arg in args:
-            new_names = self._check_arg(arg)
-            dependency_names.update(new_names)
-        return dependency_names
-
-    def _get_dependencies_from_kwargs(self, args):
-        """ Parse keyed arguments """
-        if not isinstance(args, dict):
-            raise TypeError('"kwargs" must be a dictionary')
-
-        dependency_names = set()
-        for arg in args.values():
-            new_names = self._check_arg(arg)
-            dependency_names.update(new_names)
-        return dependency_names
-
-    def _check_arg(self, arg):
-        """ Check individual argument (list/tuple/string/etc) """
-        if isinstance(arg, list):
-            return self._get_dependencies_from_args(arg)
-        elif isinstance(arg, dict):
-            return self._get_dependencies_from_kwargs(arg)
-
-        if not is_dependency_name(arg):
-            return set()
-        return set([arg[1:]])
+            template = ServiceTemplate.from_dict(conf)
+            if template.scope not in SCOPES:
+                raise InvalidServiceConfiguration(
+                    'Invalid scope "%s" of service "%s"'
+                    % (template.scope, name)
+                )
+            self._templates[name] = template
+            self._nodes[name] = template.dependencies
@@ -0,0 +1,64 @@
+""" Scalars Module """
+import os
+import threading
+
+
+class LazyScalar(object):
+    """
+        Scalar value computed by a callable the first time a service
+        uses it, then cached. Scalars no built service uses are never
+        computed.
+    """
+    def __init__(self, func, key=None):
+        """ Initialize Scalar """
+        if not callable(func):
+            raise TypeError('"func" must be callable')
+        if key is None:
+            key = '%s.%s' % (getattr(func, '__module__', None),
+                             getattr(func, '__name__', repr(func)))
+        self._func = func
+        self._key = key
+        self._lock = threading.Lock()
+        self._computed = False
+        self._value = None
+
+    @property
+    def key(self):
+        """ Return the stable description of the scalar's source """
+        return self._key
+
+    @property
+    def computed(self):
+        """ Returns true once the value has been computed """
+        return self._computed
+
+    def get(self):
+        """ Return the value, computing it at most once """
+        if not self._computed:
+            with self._lock:
+                if not self._computed:
+                    self._value = self._func()
+                    self._computed = True
+        return self._value
+
+    def __repr__(self):
+        # Names the source rather than a memory address
+        return 'LazyScalar(%s)' % self._key
+
+
+def from_env(name, default=None):
+    """ Lazy scalar reading an environment variable """
+    return LazyScalar(lambda: os.environ.get(name, default),
+                      'env:%s' % name)
+
+
+def from_file(path, strip=True):
+    """ Lazy scalar reading the content of a file (e.g. a secret) """
+    def _read():
+        """ Read the file """
+        with open(path, 'r') as scalar_file:
+            content = scalar_file.read()
+        if strip:
+            content = content.strip()
+        return content
+    return LazyScalar(_read, 'file:%s' % path)
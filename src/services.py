@@ -1,4 +1,22 @@
 """ Services Module """
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import asyncio
+except ImportError:
+    try:
+        import trollius as asyncio
+    except ImportError:
+        asyncio = None
+
+from scalars import LazyScalar
+from template import ArgumentTemplate
+from template import check_type as _check_type
+from template import is_arg_scalar
+from template import is_arg_service
+from template import ServiceTemplate
 
 
 class InvalidServiceConfiguration(Exception):
@@ -12,22 +30,11 @@ class UninstantiatedServiceException(Exception):
     """
 
 
-def is_arg_scalar(arg):
-    """ Returns true if arg starts with a dollar sign """
-    return arg[:1] == '$'
-
-
-def is_arg_service(arg):
-    """ Returns true if arg starts with an at symbol """
-    return arg[:1] == '@'
-
-
-def _check_type(name, obj, expected_type):
-    """ Raise a TypeError if object is not of expected type """
-    if not isinstance(obj, expected_type):
-        raise TypeError(
-            '"%s" must be an a %s' % (name, expected_type.__name__)
-        )
+class PoolExhaustedException(Exception):
+    """
+        Raised when no pooled instance could be
+        borrowed before the timeout expired.
+    """
 
 
 def _import_module(module_name):
@@ -45,6 +52,53 @@ def _import_module(module_name):
     return module
 
 
+def is_awaitable(value):
+    """ Returns true if value is a coroutine or an asyncio future """
+    if asyncio is None:
+        return False
+    return asyncio.iscoroutine(value) or isinstance(value, asyncio.Future)
+
+
+def _chain(loop, result, func, callback):
+    """
+        Call func and hand its return value to callback, awaiting it
+        first if it is awaitable. Failures are set on the result future.
+    """
+    if result.done():
+        return
+    try:
+        value = func()
+    # pylint: disable=broad-except
+    except Exception as exception:
+        result.set_exception(exception)
+        return
+
+    if not is_awaitable(value):
+        callback(value)
+        return
+
+    future = asyncio.ensure_future(value, loop=loop)
+
+    def _done(future):
+        """ Continue once the awaited value is ready """
+        if result.done():
+            return
+        if future.cancelled():
+            result.cancel()
+        elif future.exception() is not None:
+            result.set_exception(future.exception())
+        else:
+            callback(future.result())
+
+    def _cancelled(result):
+        """ Stop waiting on the value if the result is cancelled """
+        if result.cancelled():
+            future.cancel()
+
+    future.add_done_callback(_done)
+    result.add_done_callback(_cancelled)
+
+
 def _verify_create_args(module_name, class_name, static):
     """ Verifies a subset of the arguments to create() """
     # Verify module name is provided
@@ -60,77 +114,355 @@ def _verify_create_args(module_name, class_name, static):
         raise InvalidServiceConfiguration((tmpl0 + tmpl1) % module_name)
 
 
+class LookupCache(object):
+    """
+        Cache of imported modules and the classes looked up on them,
+        so each distinct module is imported only once.
+    """
+    def __init__(self):
+        self._modules = {}
+        self._attributes = {}
+        self._stats = {
+            'module_hits': 0,
+            'module_misses': 0,
+            'attribute_hits': 0,
+            'attribute_misses': 0
+        }
+
+    @property
+    def stats(self):
+        """ Return a copy of the hit/miss counters """
+        return dict(self._stats)
+
+    def get_module(self, module_name):
+        """ Import a module, or return it from the cache """
+        module = self._modules.get(module_name)
+        if module is not None:
+            self._stats['module_hits'] += 1
+            return module
+        self._stats['module_misses'] += 1
+        module = _import_module(module_name)
+        self._modules[module_name] = module
+        return module
+
+    def get_attribute(self, module, name):
+        """ Get an attribute of a module, or return it from the cache """
+        key = (module.__name__, name)
+        if key in self._attributes:
+            self._stats['attribute_hits'] += 1
+            return self._attributes[key]
+        self._stats['attribute_misses'] += 1
+        attribute = getattr(module, name)
+        self._attributes[key] = attribute
+        return attribute
+
+    def clear(self):
+        """ Forget every cached module and attribute """
+        self._modules.clear()
+        self._attributes.clear()
+
+
+class ServicePool(object):
+    """
+        Pool of interchangeable instances of a "pooled" service.
+        min_size instances are built up front by prewarm(); more are
+        only built when every instance is borrowed, up to max_size.
+    """
+    def __init__(self, create, min_size=1, max_size=None):
+        """ Initialize Pool """
+        if max_size is not None and max_size < min_size:
+            raise InvalidServiceConfiguration(
+                'Pool max size must not be below its min size'
+            )
+        self._create = create
+        self._min_size = min_size
+        self._max_size = max_size
+        self._idle = []
+        self._size = 0
+        self._close = None
+        self._condition = threading.Condition()
+
+    @property
+    def size(self):
+        """ Return the number of instances built """
+        return self._size
+
+    @property
+    def idle(self):
+        """ Return the number of instances ready to be borrowed """
+        return len(self._idle)
+
+    def prewarm(self):
+        """ Build instances until the pool holds min_size """
+        while self._size < self._min_size:
+            instance = self._create()
+            with self._condition:
+                self._idle.append(instance)
+                self._size += 1
+                self._condition.notify()
+
+    def borrow(self, timeout=None):
+        """
+            Take an idle instance, building one if the pool is not at
+            max_size, or waiting up to timeout seconds for a release.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            while not self._idle:
+                if self._max_size is None or self._size < self._max_size:
+                    # Reserve the slot, build outside of the lock
+                    self._size += 1
+                    break
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise PoolExhaustedException(
+                            'Timed out waiting for a pooled instance'
+                        )
+                self._condition.wait(remaining)
+            else:
+                return self._idle.pop()
+        try:
+            return self._create()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+            raise
+
+    def release(self, instance):
+        """
+            Give a borrowed instance back to the pool, or close it if
+            the pool was drained meanwhile
+        """
+        with self._condition:
+            close = self._close
+            if close is None:
+                self._idle.append(instance)
+                self._condition.notify()
+                return
+            self._size -= 1
+        close(instance)
+
+    def after_fork(self):
+        """
+            Reset the pool in a forked process, where no thread holds
+            its lock or a borrowed instance. Returns the idle instances.
+        """
+        self._condition = threading.Condition()
+        self._size = len(self._idle)
+        return list(self._idle)
+
+    def drain(self, close=None):
+        """
+            Take every idle instance out of the pool. Instances still
+            borrowed are passed to close, if given, as they are released
+            instead of rejoining the pool.
+        """
+        with self._condition:
+            self._close = close
+            instances = self._idle
+            self._idle = []
+            self._size -= len(instances)
+        return instances
+
+    @contextmanager
+    def borrowed(self, timeout=None):
+        """ Borrow an instance for the duration of a with block """
+        instance = self.borrow(timeout)
+        try:
+            yield instance
+        finally:
+            self.release(instance)
+
+
+# Process-wide cache, for factories that opt into sharing lookups
+SHARED_LOOKUP_CACHE = LookupCache()
+
+
 class ServiceFactory(object):
     """
         Class ServiceFactory handles the dynamic creation of service objects
     """
-    def __init__(self, scalars=None):
+    def __init__(self, scalars=None, lookup_cache=None):
         if scalars is None:
             self.scalars = {}
         else:
             self.scalars = scalars
+        if lookup_cache is None:
+            lookup_cache = LookupCache()
+        self.lookup_cache = lookup_cache
         self.instantiated_services = {}
+        # Callables building a new instance per use ("prototype" scope)
+        self.providers = {}
+        # Callables receiving (event, service name, phase)
+        self.hooks = []
 
-    # pylint: disable=too-many-locals, too-many-arguments
+    # pylint: disable=too-many-arguments
     def create(self, module_name, class_name,
                args=None, kwargs=None, factory_method=None,
                factory_args=None, factory_kwargs=None, static=False,
                calls=None):
         """ Initializes an instance of the service """
-        if args is None:
-            args = []
-        if kwargs is None:
-            kwargs = {}
-        if factory_args is None:
-            factory_args = []
-        if factory_kwargs is None:
-            factory_kwargs = {}
-        if static is None:
-            static = False
+        return self.create_from_template(ServiceTemplate(
+            module_name, class_name, args, kwargs, factory_method,
+            factory_args, factory_kwargs, static, calls
+        ))
+
+    def create_from_dict(self, dictionary):
+        """ Initializes an instance from a dictionary blueprint """
+        return self.create_from_template(ServiceTemplate.from_dict(dictionary))
+
+    def create_from_template(self, template, name=None):
+        """
+            Initializes an instance from a compiled ServiceTemplate.
+            name is only used to label instrumentation hook events.
+        """
+        hooks = self.hooks
 
         # Verify
-        _verify_create_args(module_name, class_name, static)
+        _verify_create_args(template.module_name, template.class_name,
+                            template.static)
 
         # Import
-        module = _import_module(module_name)
+        if hooks:
+            self.emit('start', name, 'import')
+        module = self.lookup_cache.get_module(template.module_name)
+        if hooks:
+            self.emit('end', name, 'import')
 
         # Instantiate
-        service_obj = self._instantiate(module, class_name,
-                                        args, kwargs, static)
+        if hooks:
+            self.emit('start', name, 'instantiate')
+        service_obj = self._instantiate(module, template)
+        if hooks:
+            self.emit('end', name, 'instantiate')
+
         # Factory?
-        if factory_method is not None:
-            service_obj = self._handle_factory_method(service_obj,
-                                                      factory_method,
-                                                      factory_args,
-                                                      factory_kwargs)
+        if template.factory_method is not None:
+            if hooks:
+                self.emit('start', name, 'factory-method')
+            service_obj = self._handle_factory_method(service_obj, template)
+            if hooks:
+                self.emit('end', name, 'factory-method')
+
         # Extra Calls
-        if calls is not None and isinstance(calls, list):
-            self._handle_calls(service_obj, calls)
+        if template.calls:
+            if hooks:
+                self.emit('start', name, 'calls')
+            self._handle_calls(service_obj, template.calls)
+            if hooks:
+                self.emit('end', name, 'calls')
 
         # Return
         return service_obj
 
-    def create_from_dict(self, dictionary):
-        """ Initializes an instance from a dictionary blueprint """
-        has_args = 'args' in dictionary
-        has_kwargs = 'kwargs' in dictionary
-        has_factory_method = 'factory-method' in dictionary
-        has_factory_args = 'factory-args' in dictionary
-        has_factory_kwargs = 'factory-kwargs' in dictionary
-        has_static = 'static' in dictionary
-        has_calls = 'calls' in dictionary
-        return self.create(
-            dictionary['module'],
-            dictionary['class'],
-            [] if not has_args else dictionary['args'],
-            {} if not has_kwargs else dictionary['kwargs'],
-            None if not has_factory_method else dictionary['factory-method'],
-            [] if not has_factory_args else dictionary['factory-args'],
-            {} if not has_factory_kwargs else dictionary['factory-kwargs'],
-            False if not has_static else dictionary['static'],
-            None if not has_calls else dictionary['calls']
+    def create_service(self, template, name):
+        """ Create one service, emitting "service" events to hooks """
+        if not self.hooks:
+            return self.create_from_template(template, name)
+        self.emit('start', name, 'service')
+        service = self.create_from_template(template, name)
+        self.emit('end', name, 'service')
+        return service
+
+    def emit(self, event, name, phase):
+        """ Send a "start" or "end" event of a service phase to hooks """
+        for hook in self.hooks:
+            hook(event, name, phase)
+
+    # pylint: disable=too-many-arguments
+    def acreate(self, module_name, class_name,
+                args=None, kwargs=None, factory_method=None,
+                factory_args=None, factory_kwargs=None, static=False,
+                calls=None, loop=None):
+        """
+            Same as create(), but returns an asyncio future. Coroutines
+            returned by the constructor, factory method or calls are
+            awaited before moving on to the next step.
+        """
+        return self.acreate_from_template(ServiceTemplate(
+            module_name, class_name, args, kwargs, factory_method,
+            factory_args, factory_kwargs, static, calls
+        ), loop)
+
+    def acreate_from_dict(self, dictionary, loop=None):
+        """ Same as create_from_dict(), but returns an asyncio future """
+        return self.acreate_from_template(
+            ServiceTemplate.from_dict(dictionary), loop
         )
 
+    def acreate_from_template(self, template, loop=None, name=None):
+        """
+            Same as create_from_template(), but returns an asyncio future.
+            The end event of an awaited phase is sent once it is ready.
+        """
+        if asyncio is None:
+            raise RuntimeError('asyncio (or trollius) is not available')
+        if loop is None:
+            loop = asyncio.get_event_loop()
+
+        result = asyncio.Future(loop=loop)
+        remaining_calls = list(template.calls)
+
+        def _emit(event, phase):
+            """ Send a phase event to hooks, if any """
+            if self.hooks:
+                self.emit(event, name, phase)
+
+        def _instantiate():
+            """ Verify, import and instantiate """
+            _verify_create_args(template.module_name, template.class_name,
+                                template.static)
+            _emit('start', 'import')
+            module = self.lookup_cache.get_module(template.module_name)
+            _emit('end', 'import')
+            _emit('start', 'instantiate')
+            return self._instantiate(module, template)
+
+        def _with_service(service_obj):
+            """ Factory? """
+            _emit('end', 'instantiate')
+            if template.factory_method is None:
+                _start_calls(service_obj)
+                return
+            _emit('start', 'factory-method')
+            _chain(
+                loop,
+                result,
+                lambda: self._handle_factory_method(service_obj, template),
+                _with_factory_service
+            )
+
+        def _with_factory_service(service_obj):
+            """ Factory method done """
+            _emit('end', 'factory-method')
+            _start_calls(service_obj)
+
+        def _start_calls(service_obj):
+            """ Extra calls? """
+            if remaining_calls:
+                _emit('start', 'calls')
+            _next_call(service_obj)
+
+        def _next_call(service_obj):
+            """ Extra calls, one after the other """
+            if not remaining_calls:
+                if template.calls:
+                    _emit('end', 'calls')
+                result.set_result(service_obj)
+                return
+            call = remaining_calls.pop(0)
+            _chain(
+                loop,
+                result,
+                lambda: self._handle_call(service_obj, call),
+                lambda _: _next_call(service_obj)
+            )
+
+        _chain(loop, result, _instantiate, _with_service)
+        return result
+
     def add_instantiated_service(self, name, service):
         """ Add an instatiated service by name """
         self.instantiated_services[name] = service
@@ -139,11 +471,22 @@ class ServiceFactory(object):
         """ Get instantiated services """
         return self.instantiated_services
 
+    def add_provider(self, name, provider):
+        """ Add a callable building a new instance on every use """
+        self.providers[name] = provider
+
+    def is_available(self, name):
+        """ Returns true if a service can be used as a dependency """
+        return name in self.instantiated_services or name in self.providers
+
     def get_instantiated_service(self, name):
-        """ Get instantiated service by name """
-        if name not in self.instantiated_services:
+        """ Get instantiated service (or a new prototype) by name """
+        if name in self.instantiated_services:
+            return self.instantiated_services[name]
+        provider = self.providers.get(name)
+        if provider is None:
             raise UninstantiatedServiceException
-        return self.instantiated_services[name]
+        return provider()
 
     def _replace_service_arg(self, name, index, args):
         """ Replace index in list with service """
@@ -156,66 +499,22 @@ class ServiceFactory(object):
     def _replace_scalars_in_args(self, args):
         """ Replace scalars in arguments list """
         _check_type('args', args, list)
-        new_args = []
-        for arg in args:
-            if isinstance(arg, list):
-                to_append = self._replace_scalars_in_args(arg)
-            elif isinstance(arg, dict):
-                to_append = self._replace_scalars_in_kwargs(arg)
-            elif isinstance(arg, basestring):
-                to_append = self._replace_scalar(arg)
-            else:
-                to_append = arg
-            new_args.append(to_append)
-        return new_args
+        return ArgumentTemplate(args, services=False).render(self)
 
     def _replace_scalars_in_kwargs(self, kwargs):
         """ Replace scalars in keyed arguments dictionary """
         _check_type('kwargs', kwargs, dict)
-
-        new_kwargs = {}
-        for (name, value) in kwargs.iteritems():
-            if isinstance(value, list):
-                new_kwargs[name] = self._replace_scalars_in_args(value)
-            elif isinstance(value, dict):
-                new_kwargs[name] = self._replace_scalars_in_kwargs(value)
-            elif isinstance(value, basestring):
-                new_kwargs[name] = self._replace_scalar(value)
-            else:
-                new_kwargs[name] = value
-        return new_kwargs
+        return ArgumentTemplate(kwargs, services=False).render(self)
 
     def _replace_services_in_args(self, args):
         """ Replace service references in arguments list """
         _check_type('args', args, list)
-
-        new_args = []
-        for arg in args:
-            if isinstance(arg, list):
-                new_args.append(self._replace_services_in_args(arg))
-            elif isinstance(arg, dict):
-                new_args.append(self._replace_services_in_kwargs(arg))
-            elif isinstance(arg, basestring):
-                new_args.append(self._replace_service(arg))
-            else:
-                new_args.append(arg)
-        return new_args
+        return ArgumentTemplate(args, scalars=False).render(self)
 
     def _replace_services_in_kwargs(self, kwargs):
         """ Replace service references in keyed arguments dictionary """
         _check_type('kwargs', kwargs, dict)
-
-        new_kwargs = {}
-        for (name, value) in kwargs.iteritems():
-            if isinstance(value, list):
-                new_kwargs[name] = self._replace_services_in_args(value)
-            elif isinstance(value, dict):
-                new_kwargs[name] = self._replace_services_in_kwargs(value)
-            elif isinstance(value, basestring):
-                new_kwargs[name] = self._replace_service(value)
-            else:
-                new_kwargs[name] = value
-        return new_kwargs
+        return ArgumentTemplate(kwargs, scalars=False).render(self)
 
     def get_scalar_value(self, name):
         """ Get scalar value by name """
@@ -224,6 +523,8 @@ class ServiceFactory(object):
                 'Invalid Service Argument Scalar "%s" (not found)' % name
             )
         new_value = self.scalars.get(name)
+        if isinstance(new_value, LazyScalar):
+            return new_value.get()
         return new_value
 
     def _replace_scalar(self, scalar):
@@ -239,72 +540,78 @@ class ServiceFactory(object):
             return service
         return self.get_instantiated_service(service[1:])
 
-    def _instantiate(self, module, class_name,
-                     args=None, kwargs=None, static=None):
+    def _instantiate(self, module, template):
         """ Instantiates a class if provided """
-        if args is None:
-            args = []
-        if kwargs is None:
-            kwargs = {}
-        if static is None:
-            static = False
-
-        _check_type('args', args, list)
-        _check_type('kwargs', kwargs, dict)
-
-        if static and class_name is None:
+        class_name = template.class_name
+        if template.static and class_name is None:
             return module
 
-        if static and class_name is not None:
-            return getattr(module, class_name)
+        if template.static and class_name is not None:
+            return self.lookup_cache.get_attribute(module, class_name)
 
-        service_obj = getattr(module, class_name)
-
-        # Replace scalars
-        args = self._replace_scalars_in_args(args)
-        kwargs = self._replace_scalars_in_kwargs(kwargs)
-
-        # Replace service references
-        args = self._replace_services_in_args(args)
-        kwargs = self._replace_services_in_kwargs(kwargs)
+        service_obj = self.lookup_cache.get_attribute(module, class_name)
 
+        # Replace scalars and service references in a single pass
+        args = template.args.render(self)
+        kwargs = template.kwargs.render(self)
 
         # Instantiate object
         return service_obj(*args, **kwargs)
 
-    def _handle_factory_method(self, service_obj, method_name,
-                               args=None, kwargs=None):
+    def _handle_factory_method(self, service_obj, template):
         """" Returns an object returned from a factory method """
-        if args is None:
-            args = []
-        if kwargs is None:
-            kwargs = {}
-
-        _check_type('args', args, list)
-        _check_type('kwargs', kwargs, dict)
+        args = template.factory_args.render(self)
+        kwargs = template.factory_kwargs.render(self)
 
-        # Replace args
-        new_args = self._replace_scalars_in_args(args)
-        new_kwargs = self._replace_scalars_in_kwargs(kwargs)
-
-        return getattr(service_obj, method_name)(*new_args, **new_kwargs)
+        return getattr(service_obj, template.factory_method)(*args, **kwargs)
 
     def _handle_calls(self, service_obj, calls):
         """ Performs method calls on service object """
 
         for call in calls:
-            method = call.get('method')
-            args = call.get('args', [])
-            kwargs = call.get('kwargs', {})
+            self._handle_call(service_obj, call)
+
+    def _handle_call(self, service_obj, call):
+        """ Performs a single compiled call and returns its result """
+        if call.method is None:
+            raise InvalidServiceConfiguration(
+                'Service call must define a method.'
+            )
 
-            _check_type('args', args, list)
-            _check_type('kwargs', kwargs, dict)
+        args = call.args.render(self)
+        kwargs = call.kwargs.render(self)
+        return getattr(service_obj, call.method)(*args, **kwargs)
 
-            if method is None:
-                raise InvalidServiceConfiguration(
-                    'Service call must define a method.'
-                )
 
-            new_args = self._replace_scalars_in_args(args)
-            new_kwargs = self._replace_scalars_in_kwargs(kwargs)
-            getattr(service_obj, method)(*new_args, **new_kwargs)
+class ChildServiceFactory(ServiceFactory):
+    """
+        Factory overlaying a parent factory. Services and scalars are
+        looked up locally first and then in the parent, which is shared
+        rather than copied, so creating a child costs O(1).
+    """
+    def __init__(self, parent, scalars=None):
+        super(ChildServiceFactory, self).__init__(scalars,
+                                                  parent.lookup_cache)
+        self.parent = parent
+        self.hooks = parent.hooks
+
+    def is_local(self, name):
+        """ Returns true if a service is held by this factory itself """
+        return name in self.instantiated_services or name in self.providers
+
+    def is_available(self, name):
+        """ Returns true if a service can be used as a dependency """
+        return self.is_local(name) or self.parent.is_available(name)
+
+    def get_instantiated_service(self, name):
+        """ Get a local service, or else the parent's """
+        if self.is_local(name):
+            return super(ChildServiceFactory,
+                         self).get_instantiated_service(name)
+        return self.parent.get_instantiated_service(name)
+
+    def get_scalar_value(self, name):
+        """ Get a local scalar, or else the parent's """
+        if name in self.scalars:
+            return super(ChildServiceFactory, self).get_scalar_value(name)
+        return self.parent.get_scalar_value(name)
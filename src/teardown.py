@@ -0,0 +1,127 @@
+""" Teardown Module """
+import threading
+import time
+from array import array
+from collections import deque
+from Queue import Empty
+from Queue import Queue
+
+from report import CloseReport
+from template import POOLED
+
+
+def close_instances(template, service):
+    """
+        Call the close method of a service, or of its pooled instances:
+        idle ones right away, borrowed ones when they are released
+    """
+    def _close(instance):
+        """ Close one instance """
+        getattr(instance, template.close_method)()
+
+    if template.scope == POOLED:
+        instances = service.drain(_close)
+    else:
+        instances = [service]
+    for instance in instances:
+        _close(instance)
+
+
+# pylint: disable=too-many-arguments, too-many-locals, too-many-branches
+def close_services(graph, templates, factory, names, parallel=None,
+                   timeout=None):
+    """
+        Close services in reverse topological order: a service is
+        closed once every service depending on it is. Up to parallel
+        services close at a time, each on a daemon thread; services
+        missing their timeout deadline are abandoned, so a hanging
+        close method cannot block shutdown. Returns a CloseReport.
+    """
+    services = factory.instantiated_services
+    names = [name for name in names if name in graph]
+    live = graph.mark(names)
+    remaining = array('l', [0]) * len(graph)
+    ready = deque()
+    for name in names:
+        node_id = graph.get_id(name)
+        remaining[node_id] = len([
+            dependent_id for dependent_id in graph.get_dependent_ids(node_id)
+            if live[dependent_id]
+        ])
+        if not remaining[node_id]:
+            ready.append(node_id)
+
+    latencies = {}
+    errors = {}
+    timed_out = []
+    finished = Queue()
+    # Deadline of every service being closed, by id
+    running = {}
+
+    def _finish(node_id):
+        """ Count a service as closed, readying its dependencies """
+        for dependency_id in graph.get_dependency_ids(node_id):
+            if live[dependency_id]:
+                remaining[dependency_id] -= 1
+                if not remaining[dependency_id]:
+                    ready.append(dependency_id)
+
+    def _run(node_id, name):
+        """ Close one service, reporting its latency and failure """
+        start = time.time()
+        error = None
+        if factory.hooks:
+            factory.emit('start', name, 'close')
+        try:
+            close_instances(templates[name], services[name])
+        # pylint: disable=broad-except
+        except Exception as exception:
+            error = exception
+        if factory.hooks:
+            factory.emit('end', name, 'close')
+        finished.put((node_id, time.time() - start, error))
+
+    while ready or running:
+        while ready and len(running) < (parallel or 1):
+            node_id = ready.popleft()
+            name = graph.get_name(node_id)
+            if templates[name].close_method is None:
+                _finish(node_id)
+                continue
+            running[node_id] = None
+            if timeout is not None:
+                running[node_id] = time.time() + timeout
+            thread = threading.Thread(target=_run, args=(node_id, name))
+            thread.daemon = True
+            thread.start()
+        if not running:
+            continue
+
+        deadlines = [deadline for deadline in running.itervalues()
+                     if deadline is not None]
+        block_for = None
+        if deadlines:
+            block_for = max(min(deadlines) - time.time(), 0)
+        try:
+            (node_id, latency, error) = finished.get(True, block_for)
+        except Empty:
+            now = time.time()
+            for (node_id, deadline) in running.items():
+                if deadline is not None and deadline <= now:
+                    del running[node_id]
+                    name = graph.get_name(node_id)
+                    latencies[name] = timeout
+                    timed_out.append(name)
+                    _finish(node_id)
+            continue
+        if node_id not in running:
+            # Finished after its deadline, already reported
+            continue
+        del running[node_id]
+        name = graph.get_name(node_id)
+        latencies[name] = latency
+        if error is not None:
+            errors[name] = error
+        _finish(node_id)
+
+    return CloseReport(latencies, errors, timed_out)
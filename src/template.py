@@ -0,0 +1,268 @@
+""" Template Module """
+import re
+
+
+SCALAR = '$'
+SERVICE = '@'
+LIST = '[]'
+DICT = '{}'
+INTERPOLATION = '${}'
+
+# "${name}" placeholders within a longer string; "$${" escapes one
+PLACEHOLDER = re.compile(r'\$(\$?)\{([^}]+)\}')
+
+# Service lifetimes ("scope" key)
+SINGLETON = 'singleton'
+PROTOTYPE = 'prototype'
+POOLED = 'pooled'
+REQUEST = 'request'
+SCOPES = (SINGLETON, PROTOTYPE, POOLED, REQUEST)
+
+
+def is_arg_scalar(arg):
+    """ Returns true if arg starts with a dollar sign """
+    return arg[:1] == SCALAR
+
+
+def is_arg_service(arg):
+    """ Returns true if arg starts with an at symbol """
+    return arg[:1] == SERVICE
+
+
+def check_type(name, obj, expected_type):
+    """ Raise a TypeError if object is not of expected type """
+    if not isinstance(obj, expected_type):
+        raise TypeError(
+            '"%s" must be an a %s' % (name, expected_type.__name__)
+        )
+
+
+def _compile_interpolation(value, path, slots):
+    """
+        Compile a string holding "${name}" placeholders into a render
+        node of (literal, scalar name) pieces. A string that is one
+        placeholder alone renders the scalar value itself, and "$${name}"
+        renders as a literal "${name}".
+    """
+    pieces = []
+    literal = []
+    position = 0
+    for match in PLACEHOLDER.finditer(value):
+        literal.append(value[position:match.start()])
+        position = match.end()
+        if match.group(1):
+            literal.append(match.group(0)[1:])
+            continue
+        slots.append((path, SCALAR, match.group(2)))
+        pieces.append((''.join(literal), match.group(2)))
+        literal = []
+    literal.append(value[position:])
+    tail = ''.join(literal)
+    if len(pieces) == 1 and not pieces[0][0] and not tail:
+        return (SCALAR, pieces[0][1])
+    return (INTERPOLATION, pieces, tail)
+
+
+# pylint: disable=too-many-return-statements
+def _compile(value, path, slots, scalars, services):
+    """
+        Compile value into a render node, or None when it holds no
+        scalar or service slots and can be shared as it is.
+    """
+    if isinstance(value, list):
+        items = enumerate(value)
+        kind = LIST
+    elif isinstance(value, dict):
+        items = value.iteritems()
+        kind = DICT
+    elif isinstance(value, basestring):
+        # "@name" stays a service reference even if name holds "${"
+        if services and is_arg_service(value):
+            slots.append((path, SERVICE, value[1:]))
+            return (SERVICE, value[1:])
+        if scalars and PLACEHOLDER.search(value):
+            return _compile_interpolation(value, path, slots)
+        if scalars and is_arg_scalar(value):
+            slots.append((path, SCALAR, value[1:]))
+            return (SCALAR, value[1:])
+        return None
+    else:
+        return None
+
+    entries = []
+    for (key, item) in items:
+        node = _compile(item, path + (key,), slots, scalars, services)
+        if node is not None:
+            entries.append((key, node))
+    if not entries:
+        return None
+    return (kind, entries)
+
+
+def _render(node, value, factory):
+    """ Fill the slots of one render node """
+    kind = node[0]
+    if kind == SCALAR:
+        return factory.get_scalar_value(node[1])
+    if kind == SERVICE:
+        return factory.get_instantiated_service(node[1])
+    if kind == INTERPOLATION:
+        strings = []
+        for (literal, name) in node[1]:
+            strings.append(literal)
+            strings.append('%s' % (factory.get_scalar_value(name),))
+        strings.append(node[2])
+        return ''.join(strings)
+
+    # Copy only the containers leading to slots
+    new_value = list(value) if kind == LIST else dict(value)
+    for (key, child) in node[1]:
+        new_value[key] = _render(child, value[key], factory)
+    return new_value
+
+
+class ArgumentTemplate(object):
+    """
+        An args/kwargs tree compiled once: records the path of every
+        scalar and service slot so rendering touches only those.
+    """
+    def __init__(self, value, scalars=True, services=True):
+        """ Compile Template """
+        self._value = value
+        self._slots = []
+        self._root = _compile(value, (), self._slots, scalars, services)
+
+    @property
+    def value(self):
+        """ Return the uncompiled value """
+        return self._value
+
+    @property
+    def slots(self):
+        """ Return (path, kind, name) tuples for every slot """
+        return self._slots
+
+    @property
+    def scalars(self):
+        """ Return names of the scalars used """
+        return set(name for (_, kind, name) in self._slots
+                   if kind == SCALAR)
+
+    @property
+    def services(self):
+        """ Return names of the services used """
+        return set(name for (_, kind, name) in self._slots
+                   if kind == SERVICE)
+
+    def render(self, factory):
+        """
+            Return the value with scalars and services taken from
+            factory. Subtrees without slots are shared, not copied.
+        """
+        if self._root is None:
+            return self._value
+        return _render(self._root, self._value, factory)
+
+
+class CallTemplate(object):
+    """ Compiled "calls" entry """
+    # pylint: disable=too-few-public-methods
+    def __init__(self, call):
+        """ Compile Template """
+        args = call.get('args', [])
+        kwargs = call.get('kwargs', {})
+        check_type('args', args, list)
+        check_type('kwargs', kwargs, dict)
+        self.method = call.get('method')
+        self.args = ArgumentTemplate(args, services=False)
+        self.kwargs = ArgumentTemplate(kwargs, services=False)
+
+
+class ServiceTemplate(object):
+    """ Service configuration with every argument tree compiled """
+    # pylint: disable=too-many-arguments, too-many-instance-attributes
+    # pylint: disable=too-many-locals
+    def __init__(self, module_name, class_name,
+                 args=None, kwargs=None, factory_method=None,
+                 factory_args=None, factory_kwargs=None, static=False,
+                 calls=None, scope=None, pool_min=None, pool_max=None,
+                 close_method=None, post_fork_method=None):
+        """ Compile Template """
+        if scope is None:
+            scope = SINGLETON
+        if pool_min is None:
+            pool_min = 1
+        if args is None:
+            args = []
+        if kwargs is None:
+            kwargs = {}
+        if factory_args is None:
+            factory_args = []
+        if factory_kwargs is None:
+            factory_kwargs = {}
+        if static is None:
+            static = False
+        if calls is None or not isinstance(calls, list):
+            calls = []
+
+        check_type('args', args, list)
+        check_type('kwargs', kwargs, dict)
+        check_type('args', factory_args, list)
+        check_type('kwargs', factory_kwargs, dict)
+
+        self.module_name = module_name
+        self.class_name = class_name
+        self.args = ArgumentTemplate(args)
+        self.kwargs = ArgumentTemplate(kwargs)
+        self.factory_method = factory_method
+        # Factory and call arguments only take scalars
+        self.factory_args = ArgumentTemplate(factory_args, services=False)
+        self.factory_kwargs = ArgumentTemplate(factory_kwargs,
+                                               services=False)
+        self.static = static
+        self.calls = [CallTemplate(call) for call in calls]
+        self.scope = scope
+        self.pool_min = pool_min
+        self.pool_max = pool_max
+        # Method releasing the service's resources on Resolver.close()
+        self.close_method = close_method
+        # Method run in every worker forked after resolution
+        self.post_fork_method = post_fork_method
+
+    @classmethod
+    def from_dict(cls, dictionary):
+        """ Compile a dictionary blueprint """
+        return cls(
+            dictionary.get('module'),
+            dictionary.get('class'),
+            dictionary.get('args'),
+            dictionary.get('kwargs'),
+            dictionary.get('factory-method'),
+            dictionary.get('factory-args'),
+            dictionary.get('factory-kwargs'),
+            dictionary.get('static'),
+            dictionary.get('calls'),
+            dictionary.get('scope'),
+            dictionary.get('pool-min'),
+            dictionary.get('pool-max'),
+            dictionary.get('close-method'),
+            dictionary.get('post-fork-method')
+        )
+
+    @property
+    def dependencies(self):
+        """ Return names of the services this service depends on """
+        return self.args.services | self.kwargs.services
+
+    @property
+    def scalars(self):
+        """ Return names of every scalar this service uses """
+        names = set()
+        templates = [self.args, self.kwargs,
+                     self.factory_args, self.factory_kwargs]
+        for call in self.calls:
+            templates.append(call.args)
+            templates.append(call.kwargs)
+        for template in templates:
+            names.update(template.scalars)
+        return names
@@ -1,8 +1,35 @@
 """ Tree Module """
+from array import array
+
+
+def iter_strings(node):
+    """
+        Yield the pieces of str(node) one by one, walking the subtree
+        with an explicit stack, so deep trees neither hit the recursion
+        limit nor need to be rendered into one string
+    """
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, basestring):
+            yield item
+            continue
+        children = item.children
+        if not children:
+            yield "(%s)" % item.value
+            continue
+        yield "(%s, [" % item.value
+        stack.append("])")
+        for position in xrange(len(children) - 1, -1, -1):
+            stack.append(children[position])
+            if position:
+                stack.append(", ")
 
 
 class DependencyNode(object):
     """ Dependency Node class """
+    __slots__ = ('_parent', '_children', '_value')
+
     def __init__(self, value):
         """ Initialize Node """
         self._parent = None
@@ -48,17 +75,13 @@ class DependencyNode(object):
             self.add_child(child)
 
     def __str__(self):
-        if not self._children:
-            return "(%s)" % self._value
-
-        children_strings = []
-        for child in self._children:
-            children_strings.append(str(child))
-        return "(%s, [%s])" % (self._value, ", ".join(children_strings))
+        return "".join(iter_strings(self))
 
 
 class DependencyTree(object):
     """ Dependency Tree class """
+    __slots__ = ('_heads',)
+
     def __init__(self, heads):
         """ Initialize Tree """
         self._heads = []
@@ -97,3 +120,139 @@ class DependencyTree(object):
         if not isinstance(head, DependencyNode):
             raise TypeError('"head" must be a DependencyNode')
         self._heads.append(head)
+
+
+class CompactDependencyNode(object):
+    """ Lightweight view of one node in a CompactDependencyTree """
+    __slots__ = ('_tree', '_index')
+
+    def __init__(self, tree, index):
+        """ Initialize Node view """
+        self._tree = tree
+        self._index = index
+
+    @property
+    def tree(self):
+        """ Return the CompactDependencyTree this node belongs to """
+        return self._tree
+
+    @property
+    def index(self):
+        """ Return the integer index of this node """
+        return self._index
+
+    @property
+    def value(self):
+        """ Return value """
+        return self._tree.values[self._index]
+
+    @property
+    def children(self):
+        """ Get Children """
+        tree = self._tree
+        return [CompactDependencyNode(tree, child)
+                for child in tree.get_child_indexes(self._index)]
+
+    @property
+    def child_count(self):
+        """ Get child count """
+        offsets = self._tree.offsets
+        return offsets[self._index + 1] - offsets[self._index]
+
+    def __eq__(self, other):
+        return isinstance(other, CompactDependencyNode) \
+            and other.tree is self._tree and other.index == self._index
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((id(self._tree), self._index))
+
+    def __str__(self):
+        return "".join(iter_strings(self))
+
+
+class CompactDependencyTree(object):
+    """
+        Dependency Tree stored as integer arrays (compressed sparse
+        rows): the children of node i are
+        child_indexes[offsets[i]:offsets[i + 1]]. No object is
+        allocated per node or edge; nodes are viewed on access.
+    """
+    __slots__ = ('_values', '_offsets', '_child_indexes', '_head_indexes')
+
+    def __init__(self, values, offsets, child_indexes, head_indexes=None):
+        """ Initialize Tree """
+        if not isinstance(values, list):
+            raise TypeError('"values" must be a list')
+        if len(offsets) != len(values) + 1:
+            raise ValueError('"offsets" must have one entry per value + 1')
+        if head_indexes is None:
+            head_indexes = array('l', range(len(values)))
+        self._values = values
+        self._offsets = offsets
+        self._child_indexes = child_indexes
+        self._head_indexes = head_indexes
+
+    @classmethod
+    def from_nodes(cls, nodes):
+        """
+            Build a tree from a dependency graph (name -> set of names),
+            with every name as a head like detect_circle does.
+        """
+        if not isinstance(nodes, dict):
+            raise TypeError('"nodes" must be a dictionary')
+
+        values = list(nodes)
+        index = dict((value, position)
+                     for (position, value) in enumerate(values))
+        offsets = array('l', [0])
+        child_indexes = array('l')
+        for value in values:
+            child_indexes.extend(index[child] for child in nodes[value])
+            offsets.append(len(child_indexes))
+        return cls(values, offsets, child_indexes)
+
+    @property
+    def values(self):
+        """ Return node values by index """
+        return self._values
+
+    @property
+    def offsets(self):
+        """ Return the row offsets array """
+        return self._offsets
+
+    @property
+    def child_indexes(self):
+        """ Return the child index array """
+        return self._child_indexes
+
+    def get_child_indexes(self, index):
+        """ Return the child indexes of a node """
+        offsets = self._offsets
+        return self._child_indexes[offsets[index]:offsets[index + 1]]
+
+    @property
+    def heads(self):
+        """ Get heads """
+        return [CompactDependencyNode(self, head)
+                for head in self._head_indexes]
+
+    @property
+    def head_values(self):
+        """ Return set of the head values """
+        values = self._values
+        return set(values[head] for head in self._head_indexes)
+
+    @property
+    def head_count(self):
+        """ Get head count """
+        return len(self._head_indexes)
+
+    def __str__(self):
+        head_strings = []
+        for head in self.heads:
+            head_strings.append("H" + str(head))
+        return ", ".join(head_strings)
@@ -0,0 +1,116 @@
+""" Validation Module """
+import inspect
+
+
+class ConfigValidationException(Exception):
+    """ Raised with every problem found in a service configuration """
+    def __init__(self, errors):
+        super(ConfigValidationException, self).__init__()
+        self.errors = errors
+        self.message = 'Invalid service configuration:\n%s' % '\n'.join(
+            errors
+        )
+
+
+# Stands in for "self" when binding arguments to unbound methods
+_PLACEHOLDER = object()
+
+
+def _check_signature(func, args, kwargs):
+    """
+        Return why args and kwargs cannot be passed to func, or None.
+        Callables that cannot be introspected (builtins) pass.
+    """
+    if inspect.isclass(func):
+        func = getattr(func, '__init__')
+        args = [_PLACEHOLDER] + list(args)
+    elif inspect.ismethod(func) and func.im_self is None:
+        args = [_PLACEHOLDER] + list(args)
+    try:
+        inspect.getcallargs(func, *args, **kwargs)
+    except TypeError as exception:
+        if not inspect.isfunction(getattr(func, 'im_func', func)):
+            return None
+        return str(exception)
+    return None
+
+
+# pylint: disable=too-many-branches
+def _validate_template(template, factory, nodes, signatures):
+    """ Yield the problems of one service """
+    for dependency in sorted(template.dependencies):
+        if dependency not in nodes:
+            yield 'Unknown service "@%s"' % dependency
+    for scalar in sorted(template.scalars):
+        # Lazy scalars are only checked for presence, not computed
+        if scalar not in factory.scalars:
+            yield 'Unknown scalar "$%s"' % scalar
+
+    if template.module_name is None:
+        yield 'No module defined'
+        return
+    if not template.static and template.class_name is None:
+        yield 'No class defined'
+        return
+    try:
+        target = factory.lookup_cache.get_module(template.module_name)
+    # pylint: disable=broad-except
+    except Exception as exception:
+        yield 'Module "%s" cannot be imported: %s' % (
+            template.module_name, exception
+        )
+        return
+    if template.class_name is not None:
+        try:
+            target = factory.lookup_cache.get_attribute(target,
+                                                        template.class_name)
+        except AttributeError:
+            yield 'Module "%s" has no "%s"' % (template.module_name,
+                                               template.class_name)
+            return
+        if signatures and not template.static:
+            error = _check_signature(target, template.args.value,
+                                     template.kwargs.value)
+            if error is not None:
+                yield 'Constructor: %s' % error
+
+    if template.factory_method is not None:
+        method = getattr(target, template.factory_method, None)
+        if method is None:
+            yield 'No factory method "%s"' % template.factory_method
+        elif signatures:
+            error = _check_signature(method, template.factory_args.value,
+                                     template.factory_kwargs.value)
+            if error is not None:
+                yield 'Factory method: %s' % error
+        # Calls are made on whatever the factory method returns
+        return
+
+    for call in template.calls:
+        if call.method is None:
+            yield 'Service call must define a method'
+            continue
+        method = getattr(target, call.method, None)
+        if method is None:
+            yield 'No method "%s" to call' % call.method
+        elif signatures:
+            error = _check_signature(method, call.args.value,
+                                     call.kwargs.value)
+            if error is not None:
+                yield 'Call to "%s": %s' % (call.method, error)
+
+
+def validate_templates(templates, factory, nodes, signatures=False):
+    """
+        Check every compiled ServiceTemplate without building anything:
+        references and scalars defined, modules importable, classes,
+        factory methods and called methods present and, optionally,
+        their signatures accepting the configured arguments. Returns
+        every problem found, as "service: problem" strings.
+    """
+    errors = []
+    for name in sorted(templates):
+        for error in _validate_template(templates[name], factory, nodes,
+                                        signatures):
+            errors.append('%s: %s' % (name, error))
+    return errors
@@ -1,5 +1,9 @@
 # pylint: disable=missing-docstring, no-self-use
 # pylint: disable=too-few-public-methods, blacklisted-name
+import os
+import time
+
+from services import asyncio
 
 
 class Foo(object):
@@ -115,3 +119,53 @@ class TestLogger(object):
     def config(self):
         return self._config
 
+
+def _later(value, delay=0):
+    future = asyncio.Future()
+    asyncio.get_event_loop().call_later(delay, future.set_result, value)
+    return future
+
+
+class AsyncFactory(object):
+    @classmethod
+    def get_foo(cls, delay=0):
+        return _later(Foo(), delay)
+
+    @classmethod
+    def get_spam(cls, ham, eggs):
+        return _later(AsyncSpam(ham, eggs))
+
+
+class AsyncSpam(Spam):
+    def aset_ham(self, ham):
+        future = _later(None)
+        future.add_done_callback(lambda _: self.set_ham(ham))
+        return future
+
+
+CLOSED = []
+
+
+class Closable(object):
+    def __init__(self, name, dependency=None, delay=0, fail=False):
+        self._name = name
+        self._delay = delay
+        self._fail = fail
+        self.dependency = dependency
+
+    def close(self):
+        time.sleep(self._delay)
+        if self._fail:
+            raise IOError('%s failed to close' % self._name)
+        CLOSED.append(self._name)
+
+
+class Connection(object):
+    def __init__(self, server=None):
+        self.server = server
+        self.pid = None
+        self.reconnects = 0
+
+    def reconnect(self):
+        self.pid = os.getpid()
+        self.reconnects += 1
@@ -0,0 +1,91 @@
+""" Unit Tests for Export Module """
+import json
+import unittest
+from StringIO import StringIO
+
+from export import get_subgraph_ids
+from export import write_adjacency
+from export import write_dot
+from export import write_json
+from export import write_tree
+from graph import DependencyGraph
+from resolver import detect_circle
+from tree import DependencyNode
+
+
+NODES = {
+    'a': set(['b']),
+    'b': set(['c']),
+    'c': set(),
+    'd': set(['c', 'missing'])
+}
+
+
+class ExportTest(unittest.TestCase):
+    """ Graph Exporter Unit Tests """
+    def setUp(self):
+        self._graph = DependencyGraph(NODES)
+
+    def test_json(self):
+        """ JSON holds the dependencies of every service """
+        output = StringIO()
+        write_json(self._graph, output)
+        exported = json.loads(output.getvalue())
+        self.assertEquals(
+            {'a': ['b'], 'b': ['c'], 'c': [], 'd': ['c', 'missing']},
+            dict((name, sorted(dependencies))
+                 for (name, dependencies) in exported.iteritems())
+        )
+
+    def test_subgraph(self):
+        """ Subgraphs hold the selected services and their edges """
+        graph = self._graph
+        self.assertEquals(['b'], graph.get_names(
+            get_subgraph_ids(graph, ['b'])
+        ))
+        self.assertEquals(set(['b', 'c']), set(graph.get_names(
+            get_subgraph_ids(graph, ['b'], dependencies=True)
+        )))
+        self.assertEquals(set(['a', 'b']), set(graph.get_names(
+            get_subgraph_ids(graph, ['b'], dependents=True)
+        )))
+
+        output = StringIO()
+        write_adjacency(graph, output, ['a', 'b'])
+        self.assertEquals(['a: b', 'b: '],
+                          sorted(output.getvalue().splitlines()))
+
+    def test_dot(self):
+        """ DOT output is a digraph of the selected services """
+        output = StringIO()
+        write_dot(self._graph, output, ['d'], dependencies=True)
+        lines = output.getvalue().splitlines()
+        self.assertEquals('digraph services {', lines[0])
+        self.assertEquals('}', lines[-1])
+        assert '  "d" -> "c";' in lines
+        assert '  "missing" [style=dashed];' in lines
+        assert '  "a";' not in lines
+
+    def test_tree(self):
+        """ Trees stream the same string as str() """
+        tree = detect_circle({
+            'a': set(['b', 'c']),
+            'b': set(['c']),
+            'c': set()
+        })
+        output = StringIO()
+        write_tree(tree, output)
+        self.assertEquals(str(tree), output.getvalue())
+
+    # pylint: disable=no-self-use
+    def test_deep_tree(self):
+        """ Deep trees render without recursion """
+        head = DependencyNode(0)
+        node = head
+        for value in xrange(1, 5000):
+            child = DependencyNode(value)
+            node.add_child(child)
+            node = child
+        rendered = str(head)
+        assert rendered.startswith('(0, [(1, [(2, [')
+        assert rendered.endswith('(4999)' + '])' * 4999)
@@ -0,0 +1,90 @@
+""" Unit Tests for Graph Module """
+import unittest
+
+from graph import DependencyGraph
+from graph import TransitiveClosure
+
+
+class DependencyGraphTest(unittest.TestCase):
+    """ Dependency Graph Unit Tests """
+    def setUp(self):
+        self._graph = DependencyGraph({
+            'a': set(['b', 'c']),
+            'b': set(['c']),
+            'c': set(),
+            'd': set(['missing'])
+        })
+
+    def test_interning(self):
+        """ Names map to dense ids and back """
+        graph = self._graph
+        self.assertEquals(4, len(graph))
+        self.assertEquals(
+            ['a', 'b', 'c', 'd'],
+            sorted(graph.get_name(graph.get_id(name))
+                   for name in ['a', 'b', 'c', 'd'])
+        )
+        assert 'a' in graph
+        assert 'missing' not in graph
+        self.assertEquals({'d': set(['missing'])}, graph.undefined)
+
+    def test_edges(self):
+        """ Forward and reverse edges are indexed """
+        graph = self._graph
+        self.assertEquals(set(['b', 'c']), set(graph.get_dependencies('a')))
+        self.assertEquals(set(['a', 'b']), set(graph.get_dependents('c')))
+        self.assertEquals([], graph.get_dependents('a'))
+        self.assertEquals(1, graph.get_in_degree(graph.get_id('d')))
+
+    def test_topological_ids(self):
+        """ Subgraphs can be ordered on their own """
+        graph = self._graph
+        with self.assertRaises(Exception):
+            graph.topological_ids()
+
+        node_ids = graph.closure_ids([graph.get_id('a')])
+        self.assertEquals(
+            ['c', 'b', 'a'],
+            graph.get_names(graph.topological_ids(node_ids))
+        )
+
+    def test_closures(self):
+        """ Closures walk forward and reverse edges """
+        graph = self._graph
+        closure = graph.closure_ids([graph.get_id('a')],
+                                    graph.mark(['b']))
+        self.assertEquals(set(['a', 'c']), set(graph.get_names(closure)))
+
+        closure = graph.dependent_closure_ids([graph.get_id('c')])
+        self.assertEquals(set(['a', 'b', 'c']),
+                          set(graph.get_names(closure)))
+
+    def test_queries(self):
+        """ Ancestors, descendants and depths """
+        graph = self._graph
+        self.assertEquals(set(['a', 'b']), set(graph.get_ancestors('c')))
+        self.assertEquals(set(['b', 'c']), set(graph.get_descendants('a')))
+        self.assertEquals([], graph.get_descendants('c'))
+        self.assertEquals([], graph.get_descendants('d'))
+        self.assertEquals(2, graph.get_depth('a'))
+        self.assertEquals(1, graph.get_depth('b'))
+        self.assertEquals(0, graph.get_depth('c'))
+        self.assertEquals(0, graph.get_depth('d'))
+
+    def test_transitive_closure(self):
+        """ The closure answers the same queries from bitsets """
+        graph = self._graph
+        closure = TransitiveClosure(graph)
+        for name in ['a', 'b', 'c', 'd']:
+            self.assertEquals(set(graph.get_ancestors(name)),
+                              set(closure.get_ancestors(name)))
+            self.assertEquals(set(graph.get_descendants(name)),
+                              set(closure.get_descendants(name)))
+        assert closure.depends_on('a', 'c')
+        assert not closure.depends_on('c', 'a')
+        assert not closure.depends_on('d', 'c')
+
+    def test_cycle_depth(self):
+        """ Cycles have no depth """
+        graph = DependencyGraph({'a': set(['b']), 'b': set(['a'])})
+        self.assertRaises(Exception, graph.get_depth, 'a')
@@ -0,0 +1,107 @@
+""" Unit Tests for Hooks Module """
+import json
+import unittest
+from StringIO import StringIO
+
+from async_resolver import AsyncResolver
+from hooks import ChromeTraceCollector
+from resolver import Resolver
+from services import asyncio
+
+
+class ChromeTraceCollectorTest(unittest.TestCase):
+    """ Chrome Trace Collector Unit Tests """
+    def setUp(self):
+        self._config = {
+            'foo': {
+                'module': 'example_classes',
+                'class': 'Factory',
+                'factory-method': 'get_foo'
+            },
+            'spam': {
+                'module': 'example_classes',
+                'class': 'Spam',
+                'calls': [{'method': 'set_ham', 'args': ['ham']}]
+            },
+            'bar': {
+                'module': 'example_classes',
+                'class': 'Bar',
+                'args': ['@foo']
+            }
+        }
+
+    def test_phases(self):
+        """ Every phase of every service is recorded """
+        events = []
+        resolver = Resolver(self._config)
+        resolver.add_hook(lambda *event: events.append(event))
+        resolver.do()
+
+        self.assertEquals(
+            [
+                ('start', 'foo', 'service'),
+                ('start', 'foo', 'import'),
+                ('end', 'foo', 'import'),
+                ('start', 'foo', 'instantiate'),
+                ('end', 'foo', 'instantiate'),
+                ('start', 'foo', 'factory-method'),
+                ('end', 'foo', 'factory-method'),
+                ('end', 'foo', 'service')
+            ],
+            [event for event in events if event[1] == 'foo']
+        )
+        self.assertIn(('start', 'spam', 'calls'), events)
+        self.assertIn(('end', 'spam', 'calls'), events)
+
+    @unittest.skipIf(asyncio is None, 'asyncio is not available')
+    def test_async_phases(self):
+        """ AsyncResolver sends the same phase events """
+        events = []
+        resolver = AsyncResolver(self._config)
+        resolver.add_hook(lambda *event: events.append(event))
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(resolver.ado(loop=loop))
+        finally:
+            loop.close()
+
+        self.assertEquals(
+            [
+                ('start', 'foo', 'service'),
+                ('start', 'foo', 'import'),
+                ('end', 'foo', 'import'),
+                ('start', 'foo', 'instantiate'),
+                ('end', 'foo', 'instantiate'),
+                ('start', 'foo', 'factory-method'),
+                ('end', 'foo', 'factory-method'),
+                ('end', 'foo', 'service')
+            ],
+            [event for event in events if event[1] == 'foo']
+        )
+        self.assertEquals(
+            [('start', 'spam', 'calls'), ('end', 'spam', 'calls')],
+            [event for event in events
+             if event[1] == 'spam' and event[2] == 'calls']
+        )
+
+    def test_chrome_trace(self):
+        """ Collected events are written as trace-event JSON """
+        collector = ChromeTraceCollector()
+        resolver = Resolver(self._config)
+        resolver.add_hook(collector)
+        resolver.do(parallel=2)
+
+        output = StringIO()
+        collector.write(output)
+        trace = json.loads(output.getvalue())
+
+        names = set(event['name'] for event in trace['traceEvents'])
+        self.assertIn('bar service', names)
+        self.assertIn('foo factory-method', names)
+        for event in trace['traceEvents']:
+            self.assertEquals('X', event['ph'])
+            assert event['dur'] >= 0
+        self.assertEquals(
+            set(['foo', 'spam', 'bar']),
+            set(collector.get_durations())
+        )
@@ -0,0 +1,88 @@
+""" Unit Tests for Loader Module """
+import os
+import shutil
+import tempfile
+import unittest
+
+from loader import ConfigLoadException
+from loader import get_cache_path
+from loader import load_config
+
+
+class LoadConfigTest(unittest.TestCase):
+    """ Config Loader Unit Tests """
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._cache_dir = os.path.join(self._dir, 'cache')
+        self._write('base.yml', (
+            'foo:\n'
+            '  module: example_classes\n'
+            '  class: Foo\n'
+            'bar:\n'
+            '  module: example_classes\n'
+            '  class: Bar\n'
+            '  args: ["@foo"]\n'
+        ))
+        self._write('app.yml', (
+            'imports: [base.yml]\n'
+            'foo:\n'
+            '  module: example_classes\n'
+            '  class: Baz\n'
+        ))
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _write(self, name, content):
+        """ Write a config file to the temporary directory """
+        path = os.path.join(self._dir, name)
+        with open(path, 'w') as config_file:
+            config_file.write(content)
+        return path
+
+    def _path(self, name):
+        """ Path of a config file """
+        return os.path.join(self._dir, name)
+
+    def test_imports(self):
+        """ Files override the services of their imports """
+        config = load_config(self._path('app.yml'))
+        self.assertEquals(set(['foo', 'bar']), set(config))
+        self.assertEquals('Baz', config['foo']['class'])
+
+    def test_merge(self):
+        """ Later files override earlier ones """
+        self._write('empty.yml', '')
+        config = load_config([self._path('app.yml'), self._path('base.yml'),
+                              self._path('empty.yml')])
+        self.assertEquals('Foo', config['foo']['class'])
+
+    def test_circular_import(self):
+        """ Files importing each other are rejected """
+        self._write('base.yml', 'imports: app.yml\n')
+        self.assertRaises(ConfigLoadException,
+                          load_config, self._path('app.yml'))
+
+    def test_cache(self):
+        """ Unchanged files are loaded from the cache """
+        paths = [self._path('app.yml')]
+        config = load_config(paths, self._cache_dir)
+        assert os.path.exists(get_cache_path(self._cache_dir, paths))
+
+        # Touching a file without changing it keeps the cache
+        os.utime(self._path('base.yml'), (0, 0))
+        self.assertEquals(config, load_config(paths, self._cache_dir))
+
+        self._write('base.yml', (
+            'spam:\n'
+            '  module: example_classes\n'
+            '  class: Spam\n'
+        ))
+        self.assertEquals(set(['foo', 'spam']),
+                          set(load_config(paths, self._cache_dir)))
+
+    def test_unwritable_cache_dir(self):
+        """ Configs load when the cache cannot be written """
+        cache_dir = self._path('base.yml')
+        config = load_config(self._path('app.yml'), cache_dir)
+        self.assertEquals(set(['foo', 'bar']), set(config))
@@ -0,0 +1,159 @@
+""" Unit Tests for Plan Module """
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from example_classes import Bar
+from example_classes import Foo
+from graph import DependencyGraph
+from plan import fingerprint
+from plan import load_plan
+from plan import ResolutionPlan
+from plan import save_plan
+from plan import ScopePlan
+from resolver import Resolver
+
+
+CONFIG = {
+    'bar': {
+        'module': 'example_classes',
+        'class': 'Bar',
+        'args': ['@foo']
+    },
+    'foo': {
+        'module': 'example_classes',
+        'class': 'Foo'
+    }
+}
+
+
+class FingerprintTest(unittest.TestCase):
+    """ Unit Tests for fingerprint method """
+    def test_fingerprint(self):
+        """ Equal configs hash equally, changed ones do not """
+        self.assertEquals(
+            fingerprint(CONFIG, {'a': 1}),
+            fingerprint(dict(CONFIG), {'a': 2})
+        )
+        self.assertNotEquals(
+            fingerprint(CONFIG, {'a': 1}),
+            fingerprint(CONFIG, {'b': 1})
+        )
+        self.assertIsNone(fingerprint({'foo': {'args': [object()]}}))
+
+    def test_stable_fingerprint(self):
+        """ Object scalars do not change the hash between processes """
+        script = ('import plan, sys; '
+                  'sys.stdout.write(plan.fingerprint({}, {"conn": object()}))')
+        source = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              '..', 'src')
+        environment = dict(os.environ, PYTHONPATH=source)
+        hashes = set(
+            subprocess.check_output([sys.executable, '-c', script],
+                                    env=environment)
+            for _ in xrange(2)
+        )
+        hashes.add(fingerprint({}, {'conn': object()}))
+        self.assertEquals(1, len(hashes))
+
+
+class ResolutionPlanTest(unittest.TestCase):
+    """ Unit Tests for plan compilation and caching """
+    def setUp(self):
+        self._cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._cache_dir)
+
+    def test_compile(self):
+        """ Compiled plans order services after their dependencies """
+        plan = Resolver(CONFIG).compile()
+
+        self.assertEquals(['foo', 'bar'], plan.order)
+        self.assertEquals(set(['foo']), plan.nodes['bar'])
+        self.assertEquals({'example_classes': set(['Bar', 'Foo'])},
+                          plan.modules)
+
+    def test_save_and_load(self):
+        """ Plans round-trip through the cache directory """
+        plan = ResolutionPlan(['foo'], {'foo': set()}, {}, {})
+        save_plan(self._cache_dir, 'key', plan)
+
+        loaded = load_plan(self._cache_dir, 'key')
+        self.assertEquals(['foo'], loaded.order)
+        self.assertEquals({'foo': set()}, loaded.nodes)
+        self.assertEquals(None, load_plan(self._cache_dir, 'other'))
+
+    def test_warm_start_skips_analysis(self):
+        """ A cached plan is used instead of walking the config """
+        Resolver(CONFIG, cache_dir=self._cache_dir).compile()
+
+        # pylint: disable=protected-access
+        original = Resolver._init_nodes
+        Resolver._init_nodes = None
+        try:
+            resolver = Resolver(CONFIG, cache_dir=self._cache_dir)
+        finally:
+            Resolver._init_nodes = original
+
+        services = resolver.do()
+        assert isinstance(services['foo'], Foo)
+        assert isinstance(services['bar'], Bar)
+        self.assertIsNone(resolver._graph)
+
+    def test_unpicklable_config(self):
+        """ Configs that cannot be cached are resolved all the same """
+        config = dict(CONFIG)
+        config['spam'] = {
+            'module': 'example_classes',
+            'class': 'Spam',
+            'kwargs': {'ham': lambda: 'ham'}
+        }
+        services = Resolver(config, cache_dir=self._cache_dir).do()
+        self.assertEquals('ham', services['spam'].ham())
+        self.assertEquals([], os.listdir(self._cache_dir))
+
+    def test_unwritable_cache_dir(self):
+        """ Cache directories that cannot be written are skipped """
+        cache_dir = os.path.join(self._cache_dir, 'file')
+        open(cache_dir, 'w').close()
+        services = Resolver(CONFIG, cache_dir=cache_dir).do()
+        assert isinstance(services['bar'], Bar)
+
+    def test_warm_start_request_scope(self):
+        """ Request scoped names are part of the cached plan """
+        config = dict(CONFIG)
+        config['spam'] = {
+            'module': 'example_classes',
+            'class': 'Spam',
+            'scope': 'request'
+        }
+        Resolver(config, cache_dir=self._cache_dir).compile()
+
+        resolver = Resolver(config, cache_dir=self._cache_dir)
+        self.assertEquals(set(['foo', 'bar']), set(resolver.do()))
+        # pylint: disable=protected-access
+        self.assertIsNone(resolver._graph)
+
+
+class ScopePlanTest(unittest.TestCase):
+    """ Scope Plan Unit Tests """
+    def test_scope_plan(self):
+        """ The subgraph holds scoped services and their dependents """
+        graph = DependencyGraph({
+            'user': set(['db']),
+            'handler': set(['user', 'log']),
+            'page': set(['handler']),
+            'db': set(),
+            'log': set()
+        })
+        plan = ScopePlan(graph, ['user'])
+
+        self.assertEquals(set(['user', 'handler', 'page']), plan.names)
+        self.assertEquals(['user', 'handler', 'page'], plan.order)
+        self.assertEquals(set(['db', 'log']), plan.requires)
+        self.assertEquals(['user', 'handler'], plan.get_order('handler'))
+        self.assertEquals(['user'], plan.get_order('user'))
@@ -0,0 +1,89 @@
+""" Unit Tests for Prefork Module """
+import gc
+import os
+import unittest
+
+from prefork import fork_workers
+from resolver import Resolver
+
+
+CONFIG = {
+    'server': {
+        'module': 'example_classes',
+        'class': 'Foo'
+    },
+    'connection': {
+        'module': 'example_classes',
+        'class': 'Connection',
+        'args': ['@server'],
+        'post-fork-method': 'reconnect'
+    },
+    'pool': {
+        'module': 'example_classes',
+        'class': 'Connection',
+        'scope': 'pooled',
+        'pool-min': 2,
+        'post-fork-method': 'reconnect'
+    }
+}
+
+
+class PreforkTest(unittest.TestCase):
+    """ Prefork Unit Tests """
+    def tearDown(self):
+        """ Restore the garbage collector """
+        gc.enable()
+
+    def test_prefork_gc(self):
+        """ The collector is disabled where it cannot freeze objects """
+        Resolver(CONFIG).prefork()
+        self.assertEquals(hasattr(gc, 'freeze'), gc.isenabled())
+
+        gc.enable()
+        Resolver(CONFIG).prefork(disable_gc=False)
+        self.assertTrue(gc.isenabled())
+
+        Resolver(CONFIG).prefork(disable_gc=True)
+        self.assertFalse(gc.isenabled())
+
+    def test_after_fork(self):
+        """ Post-fork methods run on services and pooled instances """
+        resolver = Resolver(CONFIG)
+        services = resolver.prefork()
+        resolver.after_fork()
+
+        self.assertEquals(os.getpid(), services['connection'].pid)
+        with resolver.borrow('pool') as connection:
+            self.assertEquals(1, connection.reconnects)
+        self.assertEquals(2, services['pool'].size)
+
+    @unittest.skipIf(not hasattr(os, 'fork'), 'os.fork is not available')
+    def test_fork_workers(self):
+        """ Workers share the parent's services and reconnect them """
+        (read_fd, write_fd) = os.pipe()
+
+        def _serve(resolver):
+            """ Report the service seen by the worker """
+            connection = resolver.get('connection')
+            os.write(write_fd, '%d %d %d %d\n' % (
+                id(connection.server), connection.pid, os.getpid(),
+                gc.isenabled()
+            ))
+
+        resolver = Resolver(CONFIG)
+        pids = fork_workers(resolver, 2, _serve)
+        os.close(write_fd)
+        self.assertEquals([0, 0], [os.waitpid(pid, 0)[1] for pid in pids])
+        with os.fdopen(read_fd) as output:
+            lines = output.read().split()
+
+        server_id = id(resolver.get('server'))
+        reports = [lines[position:position + 4]
+                   for position in xrange(0, len(lines), 4)]
+        self.assertEquals(2, len(reports))
+        for (worker_server_id, pid, worker_pid, enabled) in reports:
+            self.assertEquals(server_id, int(worker_server_id))
+            self.assertEquals(pid, worker_pid)
+            self.assertEquals(hasattr(gc, 'freeze'), bool(int(enabled)))
+        self.assertTrue(gc.isenabled())
+        self.assertIsNone(resolver.get('connection').pid)
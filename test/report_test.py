@@ -0,0 +1,59 @@
+""" Unit Tests for Report Module """
+import unittest
+
+from report import StartupReport
+
+
+NODES = {
+    'db': set(),
+    'cache': set(),
+    'repo': set(['db']),
+    'api': set(['repo', 'cache']),
+    'log': set()
+}
+
+COSTS = {'db': 3.0, 'cache': 1.0, 'repo': 2.0, 'api': 1.0, 'log': 0.5}
+
+
+class StartupReportTest(unittest.TestCase):
+    """ Startup Report Unit Tests """
+    def test_parallel(self):
+        """ Boot time is bounded by the weighted critical path """
+        report = StartupReport(NODES, COSTS)
+
+        self.assertEquals(6.0, report.total)
+        self.assertEquals(['db', 'repo', 'api'], report.critical_path)
+        self.assertEquals(0.0, report.slack['repo'])
+        self.assertEquals(4.0, report.slack['cache'])
+        self.assertEquals(5.5, report.slack['log'])
+        self.assertEquals(3.0, report.earliest_start['repo'])
+
+        # Making db free shortens db -> repo -> api to 3s
+        self.assertEquals(('db', 3.0, 3.0), report.top[0])
+        self.assertEquals(
+            set(['db', 'repo', 'api']),
+            set(name for (name, _, _) in report.top)
+        )
+
+    def test_fractional_costs(self):
+        """ The critical path does not depend on exact float sums """
+        report = StartupReport(
+            {'a': set(), 'b': set(['a']), 'c': set(['b']), 'd': set(['c'])},
+            {'a': 0.1, 'b': 0.2, 'c': 0.3, 'd': 0.7}
+        )
+        self.assertEquals(['a', 'b', 'c', 'd'], report.critical_path)
+        self.assertAlmostEquals(1.3, report.total)
+
+    def test_sequential(self):
+        """ Boot time is the sum of every cost """
+        report = StartupReport(NODES, COSTS, 'sequential', top=2)
+
+        self.assertEquals(7.5, report.total)
+        self.assertEquals(5, len(report.critical_path))
+        self.assertEquals([('db', 3.0, 3.0), ('repo', 2.0, 2.0)],
+                          report.top)
+
+    def test_invalid_mode(self):
+        """ Only known modes are accepted """
+        with self.assertRaises(ValueError):
+            StartupReport(NODES, COSTS, 'other')
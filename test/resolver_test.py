@@ -1,9 +1,13 @@
 """ Unit Tests for Resolver Module """
+import threading
+import time
 import unittest
 import yaml
 
+from async_resolver import AsyncResolver
 from example_classes import Bar
 from example_classes import Baz
+from example_classes import CLOSED
 from example_classes import Foo
 from example_classes import Spam
 from example_classes import Qux
@@ -11,9 +15,18 @@ from example_classes import Wobble
 from example_classes import TestLogger
 from resolver import CircularDependencyException
 from resolver import detect_circle
+from resolver import find_cycles
+from resolver import get_closure
+from resolver import get_dependent_closure
 from resolver import _detect_circle
 from resolver import is_dependency_name
+from resolver import RequestScopeException
 from resolver import Resolver
+from resolver import topological_sort
+from resolver import UnknownServiceException
+from services import asyncio
+from services import InvalidServiceConfiguration
+from tree import CompactDependencyTree
 from tree import DependencyTree
 
 
@@ -273,3 +286,688 @@ class ResolverTest(unittest.TestCase):
         assert isinstance(wobble.bar, Bar)
         assert isinstance(wobble.baz, Baz)
         assert isinstance(wobble.spam, Spam)
+
+
+class TopologicalSortTest(unittest.TestCase):
+    """ Unit Tests for topological_sort method """
+    def test_dependencies_come_first(self):
+        """ Every name is ordered after its dependencies """
+        graph = {
+            'a': set(['b', 'c']),
+            'b': set(['c']),
+            'c': set(),
+            'd': set(['a'])
+        }
+        order = topological_sort(graph)
+
+        self.assertEquals(4, len(order))
+        for (name, dependencies) in graph.iteritems():
+            for dependency in dependencies:
+                assert order.index(dependency) < order.index(name)
+
+    def test_unresolvable_graph_raises(self):
+        """ Cycles and undefined dependencies cannot be ordered """
+        with self.assertRaises(Exception):
+            topological_sort({'a': set(['b']), 'b': set(['a'])})
+
+        with self.assertRaises(Exception):
+            topological_sort({'a': set(['missing'])})
+
+    def test_raises_type_exception(self):
+        """ Nodes must be a dictionary """
+        with self.assertRaises(TypeError):
+            topological_sort('not_a_dictionary')
+
+    def test_do_long_chain(self):
+        """ A chain deeper than the recursion limit resolves """
+        config = {
+            'bar0': {
+                'module': 'example_classes',
+                'class': 'Foo'
+            }
+        }
+        for index in range(1, 5000):
+            config['bar%d' % index] = {
+                'module': 'example_classes',
+                'class': 'Bar',
+                'args': ['@bar%d' % (index - 1)]
+            }
+        services = Resolver(config).do()
+
+        self.assertEquals(5000, len(services))
+        assert isinstance(services['bar4999'], Bar)
+
+
+class DetectCircleSharingTest(unittest.TestCase):
+    """ Unit Tests for the memoized depth-first search """
+    # pylint: disable=invalid-name
+    def test_common_dependencies_are_shared(self):
+        """ Nodes reached by several paths are built once """
+        graph = {
+            'a': set(['b', 'c']),
+            'b': set(['d']),
+            'c': set(['d']),
+            'd': set()
+        }
+        tree = detect_circle(graph)
+        heads = dict((head.value, head) for head in tree.heads)
+
+        (b_node, c_node) = sorted(heads['a'].children, key=lambda n: n.value)
+        self.assertIs(b_node, heads['b'])
+        self.assertIs(b_node.children[0], c_node.children[0])
+        self.assertIs(heads['d'], c_node.children[0])
+
+    def test_diamond_lattice(self):
+        """ A deep diamond lattice does not explode """
+        graph = {'level0_0': set(), 'level0_1': set()}
+        for level in range(1, 200):
+            for index in range(2):
+                graph['level%d_%d' % (level, index)] = set([
+                    'level%d_0' % (level - 1),
+                    'level%d_1' % (level - 1)
+                ])
+        tree = detect_circle(graph)
+
+        self.assertEquals(400, tree.head_count)
+
+    def test_compact(self):
+        """ Compact mode returns an array-backed tree """
+        graph = {
+            'a': set(['b', 'c']),
+            'b': set(['c']),
+            'c': set()
+        }
+        tree = detect_circle(graph, compact=True)
+
+        assert isinstance(tree, CompactDependencyTree)
+        self.assertEquals(set(['a', 'b', 'c']), tree.head_values)
+
+        with self.assertRaises(CircularDependencyException) as context:
+            detect_circle({'a': set(['b']), 'b': set(['a'])}, compact=True)
+        self.assertEquals('a->b->a', context.exception.node_path)
+
+    def test_long_names_in_circle(self):
+        """ Multi-character names are tracked as whole names """
+        with self.assertRaises(CircularDependencyException) as context:
+            detect_circle({'foo': set(['bar']), 'bar': set(['foo'])})
+
+        self.assertIn(
+            context.exception.node_path,
+            ['foo->bar->foo', 'bar->foo->bar']
+        )
+
+
+class FindCyclesTest(unittest.TestCase):
+    """ Unit Tests for find_cycles method """
+    # pylint: disable=invalid-name
+    def test_every_cycle_is_found(self):
+        """ All circular components are reported in one pass """
+        graph = {
+            'a': set(['b']),
+            'b': set(['c']),
+            'c': set(['a']),
+            'd': set(['e']),
+            'e': set(['d', 'f']),
+            'f': set(),
+            'g': set(['g']),
+            'h': set(['a'])
+        }
+        cycles = sorted(find_cycles(graph), key=lambda cycle: cycle[1])
+
+        self.assertEquals(
+            [
+                (set(['a', 'b', 'c']), ['a', 'b', 'c', 'a']),
+                (set(['d', 'e']), ['d', 'e', 'd']),
+                (set(['g']), ['g', 'g'])
+            ],
+            cycles
+        )
+
+    def test_acyclic_graph(self):
+        """ No cycles are found in a valid graph """
+        graph = {
+            'a': set(['b', 'c']),
+            'b': set(['c']),
+            'c': set()
+        }
+        self.assertEquals([], find_cycles(graph))
+
+    def test_raises_type_exception(self):
+        """ Nodes must be a dictionary """
+        with self.assertRaises(TypeError):
+            find_cycles('not_a_dictionary')
+
+    def test_detect_circle_carries_all_cycles(self):
+        """ CircularDependencyException reports every cycle """
+        graph = {
+            'a': set(['b']),
+            'b': set(['a']),
+            'c': set(['d']),
+            'd': set(['c'])
+        }
+        with self.assertRaises(CircularDependencyException) as context:
+            detect_circle(graph)
+
+        self.assertEquals(2, len(context.exception.cycles))
+        self.assertEquals(
+            ['a->b->a', 'c->d->c'],
+            sorted(context.exception.node_paths)
+        )
+
+
+class LazyResolverTest(unittest.TestCase):
+    """ Unit Tests for on-demand resolution """
+    # pylint: disable=invalid-name, blacklisted-name
+    def test_get_closure(self):
+        """ Closure holds names and their transitive dependencies """
+        graph = {
+            'a': set(['b']),
+            'b': set(['c']),
+            'c': set(),
+            'd': set(['a'])
+        }
+        self.assertEquals(set(['a', 'b', 'c']), get_closure(graph, ['a']))
+        self.assertEquals(set(['a']), get_closure(graph, ['a'], set(['b'])))
+
+        with self.assertRaises(UnknownServiceException) as context:
+            get_closure(graph, ['a', 'missing'])
+        self.assertEquals(['missing'], context.exception.names)
+
+    # pylint: disable=protected-access
+    def test_get_instantiates_only_closure(self):
+        """ Resolver.get builds only what the service needs """
+        config = yaml.load(open('test/test_config.yml', 'r')) or {}
+        resolver = Resolver(config)
+
+        bar = resolver.get('bar')
+        assert isinstance(bar, Bar)
+        self.assertEquals(
+            set(['foo', 'bar']),
+            set(resolver._factory.instantiated_services)
+        )
+
+        # Memoized services are reused
+        qux = resolver.get('qux')
+        assert isinstance(qux, Qux)
+        self.assertIs(bar, resolver.get('bar'))
+        self.assertIs(bar, qux._bar)
+        self.assertIs(bar, resolver.do()['bar'])
+
+
+class ParallelResolverTest(unittest.TestCase):
+    """ Unit Tests for thread pool resolution """
+    def test_do_parallel(self):
+        """ Parallel resolution builds the same services """
+        config = yaml.load(open('test/test_config.yml', 'r')) or {}
+        services = Resolver(config).do(parallel=4)
+
+        assert isinstance(services['qux'], Qux)
+        assert isinstance(services['wobble'], Wobble)
+        self.assertIs(services['foo'], services['wobble'].foo)
+        self.assertIs(services['bar'], services['wobble'].bar)
+
+    def test_do_parallel_long_chain(self):
+        """ Chains resolve on the pool without recursion """
+        config = {'bar0': {'module': 'example_classes', 'class': 'Foo'}}
+        for index in range(1, 2000):
+            config['bar%d' % index] = {
+                'module': 'example_classes',
+                'class': 'Bar',
+                'args': ['@bar%d' % (index - 1)]
+            }
+        services = Resolver(config).do(parallel=8)
+
+        self.assertEquals(2000, len(services))
+
+    def test_do_parallel_error(self):
+        """ Failures propagate and stop dependents from being built """
+        config = {
+            'foo': {'module': 'example_classes', 'class': 'Foo'},
+            'broken': {'module': 'example_classes', 'class': 'Missing'},
+            'bar': {
+                'module': 'example_classes',
+                'class': 'Bar',
+                'args': ['@broken']
+            }
+        }
+        resolver = Resolver(config)
+        with self.assertRaises(AttributeError):
+            resolver.do(parallel=2)
+
+        # pylint: disable=protected-access
+        self.assertNotIn('bar', resolver._factory.instantiated_services)
+
+
+@unittest.skipIf(asyncio is None, 'asyncio is not available')
+class AsyncResolverTest(unittest.TestCase):
+    """ Unit Tests for asyncio resolution """
+    def setUp(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+
+    def tearDown(self):
+        self._loop.close()
+        asyncio.set_event_loop(None)
+
+    def test_ado(self):
+        """ Awaitable factory methods and calls are awaited """
+        config = {
+            'foo': {
+                'module': 'example_classes',
+                'class': 'AsyncFactory',
+                'factory-method': 'get_foo'
+            },
+            'spam': {
+                'module': 'example_classes',
+                'class': 'AsyncFactory',
+                'factory-method': 'get_spam',
+                'factory-args': ['ham', 'eggs'],
+                'calls': [{'method': 'aset_ham', 'args': ['$new_ham']}]
+            },
+            'bar': {
+                'module': 'example_classes',
+                'class': 'Bar',
+                'args': ['@foo']
+            }
+        }
+        resolver = AsyncResolver(config, {'new_ham': 'new ham'})
+        services = self._loop.run_until_complete(resolver.ado())
+
+        assert isinstance(services['foo'], Foo)
+        assert isinstance(services['bar'], Bar)
+        self.assertEquals('new ham', services['spam'].ham)
+        self.assertEquals('eggs', services['spam'].eggs)
+
+    def test_ado_timeout(self):
+        """ Services slower than their timeout fail resolution """
+        config = {
+            'foo': {
+                'module': 'example_classes',
+                'class': 'AsyncFactory',
+                'factory-method': 'get_foo',
+                'factory-args': [10]
+            },
+            'bar': {
+                'module': 'example_classes',
+                'class': 'Bar',
+                'args': ['@foo']
+            }
+        }
+        resolver = AsyncResolver(config)
+        with self.assertRaises(asyncio.TimeoutError):
+            self._loop.run_until_complete(
+                resolver.ado(timeouts={'foo': 0.01})
+            )
+
+
+class UpdateResolverTest(unittest.TestCase):
+    """ Unit Tests for incremental re-resolution """
+    def setUp(self):
+        self._config = {
+            'foo': {'module': 'example_classes', 'class': 'Foo'},
+            'bar': {
+                'module': 'example_classes',
+                'class': 'Bar',
+                'args': ['@foo']
+            },
+            'spam': {
+                'module': 'example_classes',
+                'class': 'Spam',
+                'kwargs': {'ham': '$ham', 'eggs': {'nested': ['$eggs']}}
+            },
+            'wobble': {
+                'module': 'example_classes',
+                'class': 'Wobble',
+                'kwargs': {'spam': '@spam'}
+            }
+        }
+
+    def test_get_dependent_closure(self):
+        """ Closure holds names and everything depending on them """
+        graph = {
+            'a': set(['b']),
+            'b': set(['c']),
+            'c': set(),
+            'd': set()
+        }
+        self.assertEquals(
+            set(['a', 'b', 'c']),
+            get_dependent_closure(graph, ['c'])
+        )
+
+    def test_update_scalar(self):
+        """ Changed scalars rebuild their services and dependents """
+        resolver = Resolver(self._config, {'ham': 'ham', 'eggs': 'eggs'})
+        services = dict(resolver.do())
+
+        rebuilt = resolver.update(changed_scalars={'ham': 'new ham'})
+        self.assertEquals(set(['spam', 'wobble']), rebuilt)
+
+        new_services = resolver.do()
+        self.assertIs(services['foo'], new_services['foo'])
+        self.assertIs(services['bar'], new_services['bar'])
+        self.assertEquals('new ham', new_services['spam'].ham)
+        self.assertIs(new_services['spam'], new_services['wobble'].spam)
+
+    def test_update_config(self):
+        """ Changed services rebuild themselves and dependents """
+        resolver = Resolver(self._config, {'ham': 'ham', 'eggs': 'eggs'})
+        services = dict(resolver.do())
+
+        changed = dict(self._config['foo'])
+        changed['class'] = 'Baz'
+        rebuilt = resolver.update({'foo': changed})
+        self.assertEquals(set(['foo', 'bar']), rebuilt)
+
+        new_services = resolver.do()
+        assert isinstance(new_services['foo'], Baz)
+        self.assertEquals('bazbar', new_services['bar'].value)
+        self.assertIs(services['spam'], new_services['spam'])
+
+        # Unchanged values rebuild nothing
+        self.assertEquals(set(), resolver.update({'foo': changed}))
+
+    def test_rejected_update(self):
+        """ Updates that cannot be built change nothing """
+        resolver = Resolver(self._config, {'ham': 'ham', 'eggs': 'eggs'})
+        services = dict(resolver.do())
+        cyclic = dict(self._config['foo'], args=['@bar'])
+        undefined = dict(self._config['foo'], args=['@nope'])
+        scoped = dict(self._config['foo'], scope='request')
+
+        with self.assertRaises(Exception):
+            resolver.update({'foo': cyclic}, {'ham': 'new ham'})
+        with self.assertRaises(UnknownServiceException):
+            resolver.update({'foo': undefined})
+        with self.assertRaises(RequestScopeException):
+            resolver.update({'foo': scoped})
+
+        self.assertEquals(services, resolver.do())
+        for (name, service) in services.iteritems():
+            self.assertIs(service, resolver.get(name))
+        # The previous config and scalars are still in place
+        self.assertEquals(set(), resolver.update(self._config, {'ham': 'ham'}))
+        changed = dict(self._config['foo'], **{'class': 'Baz'})
+        self.assertEquals(set(['foo', 'bar']),
+                          resolver.update({'foo': changed}))
+
+
+class ScopeResolverTest(unittest.TestCase):
+    """ Service Lifetime Unit Tests """
+    def setUp(self):
+        self._config = {
+            'foo': {
+                'module': 'example_classes',
+                'class': 'Foo',
+                'scope': 'prototype'
+            },
+            'bar': {
+                'module': 'example_classes',
+                'class': 'Bar',
+                'args': ['@foo']
+            },
+            'spam': {
+                'module': 'example_classes',
+                'class': 'Spam',
+                'scope': 'pooled',
+                'pool-min': 2,
+                'pool-max': 2
+            }
+        }
+
+    # pylint: disable=protected-access
+    def test_prototype(self):
+        """ Prototypes are built anew for every use """
+        resolver = Resolver(self._config)
+        services = resolver.do()
+
+        assert 'foo' not in services
+        self.assertEquals('foobar', services['bar'].value)
+        self.assertIsNot(resolver.get('foo'), resolver.get('foo'))
+        self.assertIsNot(services['bar']._foo, resolver.get('foo'))
+
+    def test_pooled(self):
+        """ Pooled services are prewarmed and borrowed """
+        resolver = Resolver(self._config)
+        pool = resolver.get('spam')
+        self.assertEquals(2, pool.idle)
+
+        with resolver.borrow('spam') as spam:
+            assert isinstance(spam, Spam)
+            self.assertEquals(1, pool.idle)
+        self.assertEquals(2, pool.idle)
+
+        with resolver.borrow('bar') as service:
+            self.assertIs(resolver.get('bar'), service)
+
+    def test_parallel(self):
+        """ Scopes hold when instantiating in parallel """
+        resolver = Resolver(self._config)
+        services = resolver.do(parallel=2)
+
+        assert 'foo' not in services
+        self.assertEquals('foobar', services['bar'].value)
+        self.assertEquals(2, services['spam'].size)
+
+    def test_invalid_scope(self):
+        """ Unknown scopes are rejected """
+        self._config['foo']['scope'] = 'forever'
+        self.assertRaises(InvalidServiceConfiguration,
+                          Resolver, self._config)
+
+
+class ChildResolverTest(unittest.TestCase):
+    """ Request Scope Unit Tests """
+    def setUp(self):
+        self._config = {
+            'foo': {
+                'module': 'example_classes',
+                'class': 'Foo'
+            },
+            'bar': {
+                'module': 'example_classes',
+                'class': 'Bar',
+                'args': ['@foo']
+            },
+            'spam': {
+                'module': 'example_classes',
+                'class': 'Spam',
+                'args': ['$ham'],
+                'scope': 'request'
+            },
+            'wobble': {
+                'module': 'example_classes',
+                'class': 'Wobble',
+                'kwargs': {'bar': '@bar', 'spam': '@spam'}
+            }
+        }
+
+    def test_parent_skips_request_scope(self):
+        """ Parents build neither request scoped services nor dependents """
+        resolver = Resolver(self._config, {'ham': 'ham'})
+        self.assertEquals(set(['foo', 'bar']), set(resolver.do()))
+        self.assertRaises(RequestScopeException, resolver.get, 'wobble')
+
+    def test_child(self):
+        """ Children build the request scope over the parent """
+        resolver = Resolver(self._config, {'ham': 'ham'})
+        first = resolver.child(scalars={'ham': 'first'})
+        second = resolver.child()
+
+        wobble = first.get('wobble')
+        self.assertIs(wobble, first.get('wobble'))
+        self.assertEquals('first', wobble.spam.ham)
+        self.assertIs(resolver.get('bar'), wobble.bar)
+        self.assertIs(resolver.get('foo'), first.get('foo'))
+
+        services = second.do()
+        self.assertEquals(set(['spam', 'wobble']), set(services))
+        self.assertEquals('ham', services['spam'].ham)
+        self.assertIsNot(wobble, services['wobble'])
+        self.assertIs(wobble.bar, services['wobble'].bar)
+
+    def test_concurrent_children(self):
+        """ Children on many threads share one set of parent services """
+        resolver = Resolver(self._config, {'ham': 'ham'})
+        children = []
+        lock = threading.Lock()
+
+        def _request():
+            """ Build a child and its handler """
+            child = resolver.child()
+            child.get('wobble')
+            with lock:
+                children.append(child)
+
+        threads = [threading.Thread(target=_request) for _ in xrange(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEquals(8, len(children))
+        self.assertEquals(
+            set([id(resolver.get('bar'))]),
+            set(id(child.get('wobble').bar) for child in children)
+        )
+
+    def test_seeded_services(self):
+        """ Services handed to a child are used as they are """
+        resolver = Resolver(self._config, {'ham': 'ham'})
+        spam = Spam('request')
+        child = resolver.child({'spam': spam})
+        self.assertIs(spam, child.get('wobble').spam)
+
+
+class CloseResolverTest(unittest.TestCase):
+    """ Teardown Unit Tests """
+    def setUp(self):
+        del CLOSED[:]
+        self._config = {
+            'db': {
+                'module': 'example_classes',
+                'class': 'Closable',
+                'args': ['db'],
+                'close-method': 'close'
+            },
+            'cache': {
+                'module': 'example_classes',
+                'class': 'Closable',
+                'args': ['cache'],
+                'close-method': 'close'
+            },
+            'foo': {
+                'module': 'example_classes',
+                'class': 'Foo'
+            },
+            'handler': {
+                'module': 'example_classes',
+                'class': 'Closable',
+                'args': ['handler'],
+                'kwargs': {'dependency': '@db'},
+                'close-method': 'close'
+            },
+            'app': {
+                'module': 'example_classes',
+                'class': 'Closable',
+                'args': ['app', '@handler'],
+                'kwargs': {'delay': '$delay'},
+                'close-method': 'close'
+            }
+        }
+
+    def test_close_order(self):
+        """ Services close after everything depending on them """
+        for parallel in (None, 4):
+            del CLOSED[:]
+            resolver = Resolver(self._config, {'delay': 0})
+            services = dict(resolver.do())
+            report = resolver.close(parallel)
+
+            self.assertEquals(set(['db', 'cache', 'handler', 'app']),
+                              set(CLOSED))
+            self.assertLess(CLOSED.index('app'), CLOSED.index('handler'))
+            self.assertLess(CLOSED.index('handler'), CLOSED.index('db'))
+            self.assertEquals(set(CLOSED), set(report.latencies))
+            self.assertEquals({}, report.errors)
+            # Closed services are built anew
+            self.assertIsNot(services['db'], resolver.get('db'))
+
+    def test_errors_and_deadlines(self):
+        """ Failing and hanging services do not stop the teardown """
+        self._config['handler']['kwargs']['fail'] = True
+        resolver = Resolver(self._config, {'delay': 0.3})
+        resolver.do()
+        report = resolver.close(parallel=2, timeout=0.05)
+
+        self.assertEquals(['app'], report.timed_out)
+        self.assertEquals(['handler'], list(report.errors))
+        self.assertEquals(set(['db', 'cache']), set(CLOSED))
+        assert 'timed out' in report.format()
+        # Let the abandoned close finish before other tests run
+        time.sleep(0.3)
+
+    def test_update_closes_replaced(self):
+        """ Instances replaced by update() are closed, dependents first """
+        resolver = Resolver(self._config, {'delay': 0})
+        resolver.do()
+        config = dict(self._config['db'], args=['db2'])
+        resolver.update({'db': config})
+
+        self.assertEquals(['app', 'handler', 'db'], CLOSED)
+        resolver.close()
+        assert 'db2' in CLOSED
+
+
+class SubsetResolverTest(unittest.TestCase):
+    """ Subset Resolution Unit Tests """
+    # pylint: disable=protected-access
+    def setUp(self):
+        self._config = {
+            'foo': {
+                'module': 'example_classes',
+                'class': 'Foo'
+            },
+            'bar': {
+                'module': 'example_classes',
+                'class': 'Bar',
+                'args': ['@foo']
+            },
+            'broken': {
+                'module': 'no_such_module',
+                'class': 'Broken',
+                'args': ['@foo']
+            },
+            'orphan': {
+                'module': 'example_classes',
+                'class': 'Bar',
+                'args': ['@missing']
+            }
+        }
+
+    def test_only(self):
+        """ Only the closure is built, other modules aren't imported """
+        for parallel in (None, 2):
+            resolver = Resolver(self._config)
+            services = resolver.do(parallel, only=['bar'])
+            self.assertEquals(set(['foo', 'bar']), set(services))
+            self.assertIs(services['foo'], services['bar']._foo)
+
+    def test_unknown(self):
+        """ Unknown names and dependencies are reported up front """
+        resolver = Resolver(self._config)
+        with self.assertRaises(UnknownServiceException) as context:
+            resolver.do(only=['bar', 'nope'])
+        self.assertEquals(['nope'], context.exception.names)
+
+        with self.assertRaises(UnknownServiceException) as context:
+            resolver.do(only=['bar', 'orphan'])
+        self.assertEquals(['missing'], context.exception.names)
+        self.assertEquals({}, resolver._factory.get_instantiated_services())
+
+    def test_unknown_without_services(self):
+        """ Names are checked even when nothing is configured """
+        with self.assertRaises(UnknownServiceException) as context:
+            Resolver({}).do(only=['nope'])
+        self.assertEquals(['nope'], context.exception.names)
+        self.assertIsNone(Resolver({}).do())
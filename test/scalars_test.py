@@ -0,0 +1,68 @@
+""" Unit Tests for Scalars Module """
+import os
+import shutil
+import tempfile
+import unittest
+
+from resolver import Resolver
+from scalars import from_env
+from scalars import from_file
+from scalars import LazyScalar
+
+
+class LazyScalarTest(unittest.TestCase):
+    """ Lazy Scalar Unit Tests """
+    def setUp(self):
+        self._calls = []
+
+    def _compute(self):
+        """ Count calls """
+        self._calls.append(None)
+        return 'HAM'
+
+    def test_computed_once(self):
+        """ Values are computed on first use only """
+        scalar = LazyScalar(self._compute, 'ham')
+        assert not scalar.computed
+        self.assertEquals('HAM', scalar.get())
+        self.assertEquals('HAM', scalar.get())
+        self.assertEquals(1, len(self._calls))
+        self.assertEquals('LazyScalar(ham)', repr(scalar))
+
+    def test_unused_scalars(self):
+        """ Scalars of services that are not built are not computed """
+        eggs = LazyScalar(self._compute)
+        resolver = Resolver({
+            'spam': {
+                'module': 'example_classes',
+                'class': 'Spam',
+                'args': ['$ham', '${ham} and ${eggs}']
+            },
+            'foo': {
+                'module': 'example_classes',
+                'class': 'Foo'
+            }
+        }, {'ham': LazyScalar(lambda: 'ham'), 'eggs': eggs})
+
+        resolver.get('foo')
+        assert not eggs.computed
+        spam = resolver.get('spam')
+        self.assertEquals('ham', spam.ham)
+        self.assertEquals('ham and HAM', spam.eggs)
+
+    def test_sources(self):
+        """ Environment variables and files """
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'secret')
+            with open(path, 'w') as secret:
+                secret.write('s3cr3t\n')
+            self.assertEquals('s3cr3t', from_file(path).get())
+        finally:
+            shutil.rmtree(directory)
+
+        os.environ['SCALARS_TEST'] = 'value'
+        self.assertEquals('value', from_env('SCALARS_TEST').get())
+        self.assertEquals('default',
+                          from_env('SCALARS_TEST_UNSET', 'default').get())
+        del os.environ['SCALARS_TEST']
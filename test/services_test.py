@@ -5,7 +5,11 @@ from example_classes import Bar
 from example_classes import Foo
 from example_classes import Spam
 from example_classes import Weeble
+from services import ChildServiceFactory
+from services import LookupCache
+from services import PoolExhaustedException
 from services import ServiceFactory
+from services import ServicePool
 
 
 class ServiceFactoryTest(unittest.TestCase):
@@ -237,3 +241,105 @@ class ServiceFactoryTest(unittest.TestCase):
                 'baz': ['FLUB']
             }
         )
+
+
+class LookupCacheTest(unittest.TestCase):
+    """ Lookup Cache Unit Tests """
+    def test_modules_are_imported_once(self):
+        """ Repeated lookups are served from the cache """
+        cache = LookupCache()
+        factory = ServiceFactory({}, cache)
+        factory.create('example_classes', 'Foo')
+        factory.create('example_classes', 'Foo')
+        factory.create('example_classes', 'Wibble', static=True)
+
+        self.assertEquals(
+            {
+                'module_hits': 2,
+                'module_misses': 1,
+                'attribute_hits': 1,
+                'attribute_misses': 2
+            },
+            cache.stats
+        )
+
+    def test_shared_cache(self):
+        """ Factories can share a cache """
+        cache = LookupCache()
+        ServiceFactory({}, cache).create('example_classes', 'Foo')
+        ServiceFactory({}, cache).create('example_classes', 'Foo')
+
+        self.assertEquals(1, cache.stats['module_misses'])
+        self.assertEquals(1, cache.stats['module_hits'])
+
+        cache.clear()
+        ServiceFactory({}, cache).create('example_classes', 'Foo')
+        self.assertEquals(2, cache.stats['module_misses'])
+
+
+class ServicePoolTest(unittest.TestCase):
+    """ Service Pool Unit Tests """
+    def test_prewarm(self):
+        """ Prewarming builds min_size instances """
+        pool = ServicePool(Foo, 2, 3)
+        self.assertEquals(0, pool.size)
+        pool.prewarm()
+        self.assertEquals(2, pool.size)
+        self.assertEquals(2, pool.idle)
+
+    def test_borrow_and_release(self):
+        """ Released instances are borrowed again """
+        pool = ServicePool(Foo, 1, 2)
+        pool.prewarm()
+        with pool.borrowed() as first:
+            assert isinstance(first, Foo)
+            with pool.borrowed() as second:
+                self.assertIsNot(first, second)
+                self.assertEquals(2, pool.size)
+                self.assertRaises(PoolExhaustedException, pool.borrow, 0)
+        self.assertEquals(2, pool.idle)
+        self.assertIn(pool.borrow(), [first, second])
+
+    def test_drain(self):
+        """ Draining takes the idle instances out """
+        pool = ServicePool(Foo, 2)
+        pool.prewarm()
+        instance = pool.borrow()
+        self.assertEquals(1, len(pool.drain()))
+        self.assertEquals(0, pool.idle)
+        self.assertEquals(1, pool.size)
+        pool.release(instance)
+
+    def test_drain_borrowed(self):
+        """ Instances borrowed while draining are closed on release """
+        closed = []
+        pool = ServicePool(Foo, 2)
+        pool.prewarm()
+        with pool.borrowed() as instance:
+            self.assertEquals(1, len(pool.drain(closed.append)))
+            self.assertEquals([], closed)
+        self.assertEquals([instance], closed)
+        self.assertEquals(0, pool.size)
+        self.assertEquals(0, pool.idle)
+
+
+class ChildServiceFactoryTest(unittest.TestCase):
+    """ Child Service Factory Unit Tests """
+    # pylint: disable=protected-access
+    def test_overlay(self):
+        """ Lookups fall back to the parent """
+        parent = ServiceFactory({'ham': 'HAM', 'eggs': 'EGGS'})
+        parent.add_instantiated_service('foo', Foo())
+        child = ChildServiceFactory(parent, {'eggs': 'SGGE'})
+
+        service = child.create('example_classes', 'Bar', ['@foo'])
+        self.assertIs(parent.get_instantiated_service('foo'), service._foo)
+        spam = child.create('example_classes', 'Spam', ['$ham', '$eggs'])
+        self.assertEquals('HAM', spam.ham)
+        self.assertEquals('SGGE', spam.eggs)
+
+        child.add_instantiated_service('bar', service)
+        assert child.is_local('bar')
+        assert not child.is_local('foo')
+        assert child.is_available('foo')
+        assert not parent.is_available('bar')
@@ -0,0 +1,116 @@
+""" Unit Tests for Template Module """
+import unittest
+
+from example_classes import Foo
+from services import ServiceFactory
+from template import ArgumentTemplate
+from template import ServiceTemplate
+
+
+class ArgumentTemplateTest(unittest.TestCase):
+    """ Argument Template Unit Tests """
+    def setUp(self):
+        self._factory = ServiceFactory({'flib': 'FLIB'})
+        self._foo = Foo()
+        self._factory.add_instantiated_service('foo', self._foo)
+
+    def test_slots(self):
+        """ Slot paths are recorded exactly """
+        template = ArgumentTemplate([
+            'literal',
+            {'a': '$flib', 'b': ['x', '@foo']},
+            ('@not', '$tuples')
+        ])
+
+        self.assertEquals(
+            [((1, 'a'), '$', 'flib'), ((1, 'b', 1), '@', 'foo')],
+            sorted(template.slots)
+        )
+        self.assertEquals(set(['flib']), template.scalars)
+        self.assertEquals(set(['foo']), template.services)
+
+    def test_interpolation(self):
+        """ Placeholders within strings are compiled and filled """
+        factory = ServiceFactory({'host': 'localhost', 'port': 8080})
+        template = ArgumentTemplate(
+            ['${host}:${port}', '${port}', 'http://${host}/', 'cost: $5'],
+            services=False
+        )
+        self.assertEquals(set(['host', 'port']), template.scalars)
+        self.assertEquals(
+            ['localhost:8080', 8080, 'http://localhost/', 'cost: $5'],
+            template.render(factory)
+        )
+
+    def test_interpolation_escape(self):
+        """ "$${" keeps a literal placeholder """
+        factory = ServiceFactory({'host': 'localhost'})
+        template = ArgumentTemplate(
+            ['$${HOME}/x', '${host}: $${host}', '$${host}'],
+            services=False
+        )
+        self.assertEquals(set(['host']), template.scalars)
+        self.assertEquals(
+            ['${HOME}/x', 'localhost: ${host}', '${host}'],
+            template.render(factory)
+        )
+
+    def test_interpolation_tuple(self):
+        """ Tuple scalars are interpolated whole """
+        factory = ServiceFactory({'pair': (1, 2)})
+        template = ArgumentTemplate(['pair ${pair}'], services=False)
+        self.assertEquals(['pair (1, 2)'], template.render(factory))
+
+    def test_service_placeholder(self):
+        """ "@" references are never interpolated """
+        template = ArgumentTemplate(['@${host}'])
+        self.assertEquals(set(['${host}']), template.services)
+        self.assertEquals(set(), template.scalars)
+
+    def test_render(self):
+        """ Slots are filled and literal subtrees are shared """
+        literal = range(1000)
+        value = [literal, {'a': '$flib', 'b': ['x', '@foo']}]
+        rendered = ArgumentTemplate(value).render(self._factory)
+
+        self.assertEquals(
+            [literal, {'a': 'FLIB', 'b': ['x', self._foo]}],
+            rendered
+        )
+        self.assertIs(literal, rendered[0])
+        self.assertEquals('$flib', value[1]['a'])
+
+    def test_render_without_slots(self):
+        """ Values without slots are returned untouched """
+        value = {'a': [1, 2, 3]}
+        self.assertIs(value, ArgumentTemplate(value).render(self._factory))
+
+    def test_scalars_only(self):
+        """ Service references can be left alone """
+        template = ArgumentTemplate(['$flib', '@foo'], services=False)
+        self.assertEquals(['FLIB', '@foo'], template.render(self._factory))
+
+
+class ServiceTemplateTest(unittest.TestCase):
+    """ Service Template Unit Tests """
+    def test_from_dict(self):
+        """ Dependencies and scalars are gathered from every tree """
+        template = ServiceTemplate.from_dict({
+            'module': 'example_classes',
+            'class': 'Factory',
+            'args': ['@foo'],
+            'kwargs': {'bar': {'nested': '@bar'}},
+            'factory-method': 'get_spam',
+            'factory-args': ['$ham', '@not_a_dependency'],
+            'calls': [{'method': 'set_eggs', 'kwargs': {'eggs': '$eggs'}}]
+        })
+
+        self.assertEquals(set(['foo', 'bar']), template.dependencies)
+        self.assertEquals(set(['ham', 'eggs']), template.scalars)
+
+    def test_invalid_types(self):
+        """ Argument trees must be lists and dictionaries """
+        with self.assertRaises(TypeError):
+            ServiceTemplate('example_classes', 'Foo', args='not_a_list')
+        with self.assertRaises(TypeError):
+            ServiceTemplate('example_classes', 'Foo', kwargs=[])
@@ -0,0 +1,55 @@
+""" Unit Tests for Tree Module """
+import unittest
+from array import array
+
+from tree import CompactDependencyTree
+from tree import DependencyNode
+
+
+class DependencyNodeTest(unittest.TestCase):
+    """ Dependency Node Unit Tests """
+    def test_slots(self):
+        """ Nodes carry no per-instance dictionary """
+        node = DependencyNode('a')
+        assert not hasattr(node, '__dict__')
+        with self.assertRaises(AttributeError):
+            node.other = 1  # pylint: disable=assigning-non-slot
+
+
+class CompactDependencyTreeTest(unittest.TestCase):
+    """ Compact Dependency Tree Unit Tests """
+    def setUp(self):
+        self._tree = CompactDependencyTree.from_nodes({
+            'a': set(['b', 'c']),
+            'b': set(['c']),
+            'c': set()
+        })
+
+    def test_heads(self):
+        """ Every name is a head """
+        self.assertEquals(3, self._tree.head_count)
+        self.assertEquals(set(['a', 'b', 'c']), self._tree.head_values)
+
+    def test_children(self):
+        """ Children are read from the index arrays """
+        heads = dict((head.value, head) for head in self._tree.heads)
+
+        self.assertEquals(2, heads['a'].child_count)
+        self.assertEquals(
+            set(['b', 'c']),
+            set(child.value for child in heads['a'].children)
+        )
+        self.assertEquals([heads['c']], heads['b'].children)
+        self.assertIs(self._tree, heads['b'].tree)
+        self.assertEquals([], heads['c'].children)
+        self.assertEquals(3, len(self._tree.child_indexes))
+
+    def test_str(self):
+        """ Rendering matches DependencyTree """
+        tree = CompactDependencyTree(
+            ['a', 'b'],
+            array('l', [0, 1, 1]),
+            array('l', [1]),
+            array('l', [0])
+        )
+        self.assertEquals('H(a, [(b)])', str(tree))
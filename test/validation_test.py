@@ -0,0 +1,91 @@
+""" Unit Tests for Validation Module """
+import unittest
+
+from resolver import Resolver
+from validation import ConfigValidationException
+
+
+CONFIG = {
+    'foo': {
+        'module': 'example_classes',
+        'class': 'Foo'
+    },
+    'bar': {
+        'module': 'example_classes',
+        'class': 'Bar',
+        'args': ['@fo', '$flib']
+    },
+    'spam': {
+        'module': 'example_classes',
+        'class': 'Spam',
+        'kwargs': {'bacon': '$ham'},
+        'calls': [{'method': 'set_ham'}, {'method': 'fry'}]
+    },
+    'more_spam': {
+        'module': 'example_classes',
+        'class': 'Factory',
+        'static': True,
+        'factory-method': 'get_spam',
+        'factory-args': ['$ham']
+    },
+    'nothing': {
+        'module': 'example_classes',
+        'class': 'Nothing'
+    },
+    'nowhere': {
+        'module': 'no_such_module',
+        'class': 'Nowhere'
+    },
+    'ouroboros': {
+        'module': 'example_classes',
+        'class': 'Bar',
+        'args': ['@ouroboros']
+    }
+}
+
+
+class ValidateTest(unittest.TestCase):
+    """ Validation Unit Tests """
+    # pylint: disable=no-self-use, protected-access
+    def test_valid(self):
+        """ Valid configs have no errors """
+        resolver = Resolver({'foo': CONFIG['foo']})
+        self.assertEquals([], resolver.validate(signatures=True))
+
+    def test_errors(self):
+        """ Every error is reported, nothing is built """
+        resolver = Resolver(CONFIG, {'ham': 'ham'})
+        errors = resolver.validate()
+
+        self.assertEquals([
+            'bar: Unknown service "@fo"',
+            'bar: Unknown scalar "$flib"',
+            'nothing: Module "example_classes" has no "Nothing"',
+            'spam: No method "fry" to call',
+            'Circular dependency: ouroboros -> ouroboros'
+        ], [error for error in errors if not error.startswith('nowhere')])
+        assert errors[3].startswith(
+            'nowhere: Module "no_such_module" cannot be imported'
+        )
+        self.assertEquals({}, resolver._factory.get_instantiated_services())
+
+    def test_signatures(self):
+        """ Arguments are bound to constructors and methods """
+        resolver = Resolver(CONFIG, {'ham': 'ham'})
+        errors = resolver.validate(signatures=True)
+
+        assert [error for error in errors
+                if error.startswith('spam: Constructor: ')]
+        assert [error for error in errors
+                if error.startswith('spam: Call to "set_ham": ')]
+        assert [error for error in errors
+                if error.startswith('more_spam: Factory method: ')]
+        assert not [error for error in errors
+                    if error.startswith('foo')]
+
+    def test_raise_errors(self):
+        """ Errors can be raised at once """
+        resolver = Resolver(CONFIG, {'ham': 'ham'})
+        with self.assertRaises(ConfigValidationException) as context:
+            resolver.validate(raise_errors=True)
+        self.assertEquals(resolver.validate(), context.exception.errors)